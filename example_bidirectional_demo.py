@@ -15,7 +15,15 @@ from src.websocket_sse_server.main import app
 
 def run_server():
     """Run the main server."""
-    uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
+    uvicorn.run(
+        app,
+        host="127.0.0.1",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        log_level="info",
+    )
 
 
 def test_bidirectional_communication():
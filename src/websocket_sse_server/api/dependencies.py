@@ -0,0 +1,16 @@
+"""FastAPI dependencies shared by the API routers."""
+
+from ..core.connection_manager import ConnectionManager
+from ..core.sse_handler import SSEHandler
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Get the global connection manager instance."""
+    from ..main import connection_manager
+    return connection_manager
+
+
+def get_sse_handler() -> SSEHandler:
+    """Get the global SSE handler instance."""
+    from ..main import sse_handler
+    return sse_handler
@@ -1,7 +1,6 @@
 """SSE endpoints for receiving upstream messages and streaming to clients."""
 
 import asyncio
-import json
 import uuid
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Request
@@ -9,14 +8,26 @@ from fastapi.responses import StreamingResponse
 from loguru import logger
 from ..core.sse_handler import SSEHandler
 from ..models.message import SSEMessage
+from ..utils.compat import timeout
+from ..utils.serialization import dumps_bytes, loads
+from .dependencies import get_sse_handler
 
 router = APIRouter()
 
+# SSE framing around a JSON payload, pre-encoded so frames are built as bytes
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
 
-def get_sse_handler() -> SSEHandler:
-    """Get the global SSE handler instance."""
-    from ..main import sse_handler
-    return sse_handler
+
+# Pre-built error frames; the correlation_id is JSON-encoded before substitution
+# because clients may supply their own
+_NOT_CONNECTED_FRAME = b'data: {"error":"User not connected","correlation_id":%s}\n\n'
+_TIMEOUT_FRAME = b'data: {"error":"Timeout waiting for response","correlation_id":%s}\n\n'
+
+
+def _sse_frame(payload: bytes) -> bytes:
+    """Wrap an encoded JSON payload in an SSE data frame."""
+    return _SSE_PREFIX + payload + _SSE_SUFFIX
 
 
 @router.post("/sse/send")
@@ -27,9 +38,11 @@ async def send_sse_message_with_response(
 ):
     """Receive an SSE message from upstream and stream the WebSocket response back."""
 
-    # Generate a unique correlation ID if not provided
-    correlation_id = message.data.get('correlation_id', str(uuid.uuid4()))
-    message.data['correlation_id'] = correlation_id
+    # Generate a unique correlation ID if not provided (only when it is missing)
+    correlation_id = message.data.get('correlation_id')
+    if correlation_id is None:
+        correlation_id = uuid.uuid4().hex
+        message.data['correlation_id'] = correlation_id
 
     # Create a queue for this specific request to collect the response
     response_queue = await sse_handler.register_request_response(correlation_id)
@@ -37,10 +50,10 @@ async def send_sse_message_with_response(
     async def event_generator():
         try:
             # Forward the message to the WebSocket
-            success = await sse_handler.process_sse_message(message.model_dump())
+            success = await sse_handler.process_sse_message(message)
 
             if not success:
-                yield f"data: {json.dumps({'error': 'User not connected', 'correlation_id': correlation_id})}\n\n"
+                yield _NOT_CONNECTED_FRAME % dumps_bytes(correlation_id)
                 return
 
             # Wait for the WebSocket response and stream it back
@@ -51,27 +64,43 @@ async def send_sse_message_with_response(
 
                 try:
                     # Wait for response from WebSocket with timeout
-                    response = await asyncio.wait_for(response_queue.get(), timeout=30.0)  # 30 second timeout
-                    if response is None:  # Sentinel value to close connection
-                        break
+                    async with timeout(30.0):  # 30 second timeout
+                        response = await response_queue.get()
+
+                    # Drain anything already queued so a burst goes out in one write
+                    frames = []
+                    finished = False
+                    while True:
+                        if response is None:  # Sentinel value to close connection
+                            finished = True
+                            break
 
-                    # Format as SSE event and send
-                    yield f"data: {response}\n\n"
+                        # Responses arrive as encoded JSON bytes, so frame them directly
+                        frames.append(_sse_frame(response))
 
-                    # If this is a final response, end the stream
-                    if isinstance(response, str):
-                        response_obj = json.loads(response)
-                        if response_obj.get('is_final', False):
+                        # If this is a final response, end the stream
+                        if loads(response).get('is_final', False):
+                            finished = True
                             break
 
+                        try:
+                            response = response_queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            break
+
+                    if frames:
+                        yield b"".join(frames)
+                    if finished:
+                        break
+
                 except asyncio.TimeoutError:
                     # Send timeout message and close connection
-                    yield f"data: {json.dumps({'error': 'Timeout waiting for response', 'correlation_id': correlation_id})}\n\n"
+                    yield _TIMEOUT_FRAME % dumps_bytes(correlation_id)
                     break
 
         except Exception as e:
             logger.error(f"Error in SSE request-response stream: {e}")
-            yield f"data: {json.dumps({'error': str(e), 'correlation_id': correlation_id})}\n\n"
+            yield _sse_frame(dumps_bytes({'error': str(e), 'correlation_id': correlation_id}))
         finally:
             # Clean up the request-response mapping
             await sse_handler.unregister_request_response(correlation_id)
@@ -86,7 +115,8 @@ async def push_sse_message(
 ):
     """Receive a single SSE message from upstream."""
     try:
-        success = await sse_handler.process_sse_message(message.model_dump())
+        # Concurrent pushes are coalesced into batches by the handler
+        success = await sse_handler.push_sse_message(message)
 
         if success:
             return {"status": "success", "message": "Message delivered"}
@@ -105,9 +135,8 @@ async def push_batch_sse_messages(
 ):
     """Receive multiple SSE messages from upstream."""
     try:
-        results = await sse_handler.process_batch_sse_messages(
-            [msg.model_dump() for msg in messages]
-        )
+        # Messages are already validated by FastAPI, pass the models straight through
+        results = await sse_handler.process_batch_sse_messages(messages)
         return {"results": results}
     except Exception as e:
         logger.error(f"Error pushing batch SSE messages: {e}")
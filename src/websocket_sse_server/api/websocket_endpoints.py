@@ -1,26 +1,28 @@
 """WebSocket endpoints."""
 
-import json
+import time
+from typing import Optional, Union, cast
 from fastapi import APIRouter, WebSocket, Query, Depends
 from starlette.websockets import WebSocketDisconnect
 from loguru import logger
 from ..core.connection_manager import ConnectionManager
-from ..utils.exceptions import DuplicateConnectionError
+from ..utils.exceptions import ConnectionLimitError, DuplicateConnectionError
 from ..core.sse_handler import SSEHandler
+from .dependencies import get_connection_manager, get_sse_handler
+from ..utils.serialization import JSONDecodeError, loads
 
 router = APIRouter()
 
 
-def get_connection_manager() -> ConnectionManager:
-    """Get the global connection manager instance."""
-    from ..main import connection_manager
-    return connection_manager
-
-
-def get_sse_handler() -> SSEHandler:
-    """Get the global SSE handler instance."""
-    from ..main import sse_handler
-    return sse_handler
+async def _receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """Receive the payload of the next text or binary frame without re-encoding it."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    text = cast(Optional[str], message.get("text"))
+    if text is not None:
+        return text
+    return cast(Optional[bytes], message.get("bytes")) or b""
 
 
 @router.websocket("/ws")
@@ -32,40 +34,45 @@ async def websocket_endpoint(
 ):
     """WebSocket connection endpoint."""
     await websocket.accept()
+    connected = False
 
     try:
         # Establish connection
         await connection_manager.connect(user_id, websocket)
+        connected = True
+        await sse_handler.user_connected(user_id)
         logger.info(f"User {user_id} connected")
 
         # Keep connection alive
         while True:
             try:
                 # Receive heartbeat or client messages
-                data = await websocket.receive_text()
-                logger.debug(f"Received from {user_id}: {data}")
+                data = await _receive_frame(websocket)
+                logger.debug(f"Received from {user_id}: {data[:256]!r}")
 
                 try:
                     # Parse the received message
-                    message_data = json.loads(data)
+                    message_data = loads(data)
+
+                    # A final response is forwarded once, marked so the SSE stream closes after it;
+                    # any other message is unchanged, so its raw frame is forwarded as-is
+                    raw: Optional[Union[str, bytes]] = data
+                    if message_data.get('type') == 'final_response':
+                        message_data['is_final'] = True
+                        raw = None
 
                     # Use the user_id from the connection for routing the response
                     # but preserve any correlation_id in the message for request-response matching
-                    await sse_handler.forward_websocket_response_to_sse(user_id, message_data)
-
-                    # If the message indicates a final response, we could handle special cases here
-                    # For example, if the client sends a message indicating the conversation is complete
-                    if message_data.get('type') == 'final_response':
-                        # Optionally mark this as the final message in the stream
-                        final_msg = {**message_data, 'is_final': True}
-                        await sse_handler.forward_websocket_response_to_sse(user_id, final_msg)
+                    await sse_handler.forward_websocket_response_to_sse(user_id, message_data, raw=raw)
 
                     # Optionally, also broadcast to other WebSocket connections if needed
                     # await connection_manager.broadcast(message_data)
 
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     # If not JSON, treat as plain text
-                    response_data = {"message": data, "type": "response", "timestamp": __import__('time').time()}
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8", errors="replace")
+                    response_data = {"message": data, "type": "response", "timestamp": time.time()}
                     await sse_handler.forward_websocket_response_to_sse(user_id, response_data)
                 except Exception as e:
                     logger.error(f"Error processing WebSocket message from {user_id}: {e}")
@@ -74,7 +81,7 @@ async def websocket_endpoint(
                         await websocket.send_json({
                             "type": "error",
                             "message": "Error processing your message",
-                            "timestamp": __import__('time').time()
+                            "timestamp": time.time()
                         })
                     except Exception:
                         # If we can't send error message, continue with the loop
@@ -91,6 +98,10 @@ async def websocket_endpoint(
         logger.warning(f"Attempt to connect duplicate user {user_id}")
         await websocket.close(code=1008, reason="User already connected")
         return
+    except ConnectionLimitError:
+        logger.warning(f"Connection limit reached, rejecting user {user_id}")
+        await websocket.close(code=1013, reason="Too many connections")
+        return
     except WebSocketDisconnect:
         logger.info(f"User {user_id} disconnected")
     except Exception as e:
@@ -100,5 +111,10 @@ async def websocket_endpoint(
         except Exception:
             pass  # Ignore errors during error handling
     finally:
-        await connection_manager.disconnect(user_id)
+        # A rejected connect never registered, so it must not touch the user's live connection
+        if connected:
+            await connection_manager.disconnect(user_id, websocket)
+            # Keep the subscription if the user already reconnected to this worker
+            if user_id not in connection_manager.connections:
+                await sse_handler.user_disconnected(user_id)
         logger.info(f"Cleaned up connection for user {user_id}")
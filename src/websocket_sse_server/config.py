@@ -1,12 +1,22 @@
 """Configuration management using Pydantic settings."""
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional, Set, List
+from typing import FrozenSet, Optional, Set, List
 import os
 import re
 from pydantic import field_validator
 
 
+# Validation patterns, compiled once at import
+_HOST_PATTERN = re.compile(r'^[\w\.\-\*]+$')
+_URL_PATTERN = re.compile(
+    r'^https?://'  # http:// or https://
+    r'(?:[a-zA-Z0-9-]+\.)?[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)*\.[a-zA-Z]{2,}'  # domain (including localhost)
+    r'(?::[0-9]+)?$'  # optional port
+)
+_LOCAL_ORIGINS = frozenset({'http://localhost', 'https://localhost', 'http://127.0.0.1', 'https://127.0.0.1'})
+
+
 class Settings(BaseSettings):
     """Application configuration."""
 
@@ -19,10 +29,19 @@ class Settings(BaseSettings):
     ws_path: str = "/ws"
     ws_ping_interval: int = 30  # seconds
     ws_ping_timeout: int = 10   # seconds
+    ws_batch_max_size: int = 1  # messages merged per queued frame; 1 disables batching
+    ws_max_connections: int = 0  # open connections admitted at once; 0 disables the limit
+    ws_connect_wait_timeout: float = 10.0  # seconds a connect waits for a free slot
 
     # SSE
     sse_path: str = "/sse/push"
     sse_batch_path: str = "/sse/push/batch"
+    sse_trust_upstream: bool = False  # skip validation of raw dict messages from trusted upstreams
+    sse_send_timeout: float = 5.0  # seconds per message in a batch before it counts as failed; 0 disables
+
+    # Redis fan-out across workers
+    redis_url: Optional[str] = None  # e.g. redis://localhost:6379/0; unset delivers to local connections only
+    redis_channel_prefix: str = "user:"
 
     # Logging
     log_level: str = "INFO"
@@ -43,7 +62,7 @@ class Settings(BaseSettings):
         if not v or not isinstance(v, str):
             raise ValueError('Host must be a non-empty string')
         # Basic validation for IP address or domain name
-        if not re.match(r'^[\w\.\-\*]+$', v):
+        if not _HOST_PATTERN.match(v):
             raise ValueError(f'Invalid host format: {v}')
         return v
 
@@ -81,40 +100,36 @@ class Settings(BaseSettings):
     @staticmethod
     def is_valid_url(url: str) -> bool:
         """Basic URL validation."""
-        url_pattern = re.compile(
-            r'^https?://'  # http:// or https://
-            r'(?:[a-zA-Z0-9-]+\.)?[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)*\.[a-zA-Z]{2,}'  # domain (including localhost)
-            r'(?::[0-9]+)?$'  # optional port
-        )
-        return bool(url_pattern.match(url)) or url in ['http://localhost', 'https://localhost', 'http://127.0.0.1', 'https://127.0.0.1']
+        return bool(_URL_PATTERN.match(url)) or url in _LOCAL_ORIGINS
 
 
 settings = Settings()
 
 
 # Public accounts configuration
-def load_public_accounts_from_env() -> Set[str]:
+def load_public_accounts_from_env() -> FrozenSet[str]:
     """
     Load public accounts from environment variable.
 
     Environment variable format: PUBLIC_ACCOUNTS=account1,account2,account3
     """
     env_value = os.getenv("PUBLIC_ACCOUNTS", "")
-    if env_value:
-        return set(account.strip() for account in env_value.split(",") if account.strip())
-    return set()
+    return frozenset(account for account in map(str.strip, env_value.split(",")) if account)
 
 
 # Default public accounts - can be overridden by environment variable
-DEFAULT_PUBLIC_ACCOUNTS: Set[str] = {
+DEFAULT_PUBLIC_ACCOUNTS: FrozenSet[str] = frozenset({
     "ci_bot",
     "email_bot",
     "notification_bot",
     "system_bot"
-}
+})
+
+# Public accounts known at startup - combines defaults with environment variables
+PUBLIC_ACCOUNTS: FrozenSet[str] = DEFAULT_PUBLIC_ACCOUNTS | load_public_accounts_from_env()
 
-# Public accounts set - combines defaults with environment variables
-PUBLIC_ACCOUNTS: Set[str] = DEFAULT_PUBLIC_ACCOUNTS.union(load_public_accounts_from_env())
+# Accounts registered at runtime via add_public_account
+_DYNAMIC_PUBLIC_ACCOUNTS: Set[str] = set()
 
 
 def is_public_account(account_id: str) -> bool:
@@ -127,7 +142,7 @@ def is_public_account(account_id: str) -> bool:
     Returns:
         True if the account is a public account, False otherwise
     """
-    return account_id in PUBLIC_ACCOUNTS
+    return account_id in PUBLIC_ACCOUNTS or account_id in _DYNAMIC_PUBLIC_ACCOUNTS
 
 
 def add_public_account(account_id: str) -> None:
@@ -137,7 +152,8 @@ def add_public_account(account_id: str) -> None:
     Args:
         account_id: The account ID to add
     """
-    PUBLIC_ACCOUNTS.add(account_id)
+    if account_id not in PUBLIC_ACCOUNTS:
+        _DYNAMIC_PUBLIC_ACCOUNTS.add(account_id)
 
 
 def get_public_accounts() -> Set[str]:
@@ -147,4 +163,4 @@ def get_public_accounts() -> Set[str]:
     Returns:
         Set of public account IDs
     """
-    return PUBLIC_ACCOUNTS.copy()
+    return set(PUBLIC_ACCOUNTS) | _DYNAMIC_PUBLIC_ACCOUNTS
@@ -0,0 +1,123 @@
+"""Redis pub/sub fan-out of user messages across server workers."""
+
+import asyncio
+from typing import Awaitable, Callable, Optional, Set
+from ..utils.logger import contextual_logger
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - exercised only with the redis extra installed
+    aioredis = None
+
+# Delivers a serialized JSON message to a locally connected user
+DeliverCallback = Callable[[str, str], Awaitable[bool]]
+
+# Delay before the first retry after the pub/sub connection fails (in seconds)
+LISTEN_RETRY_INITIAL_SECONDS = 0.5
+
+# Upper bound for the doubling retry delay (in seconds)
+LISTEN_RETRY_MAX_SECONDS = 30.0
+
+
+class RedisBroker:
+    """Publishes user messages to Redis and delivers them on the worker holding the user.
+
+    Each worker subscribes to one channel per locally connected user, so a
+    message is published once and Redis hands it to whichever worker holds
+    the connection. Publishing reports success if any worker was subscribed.
+    """
+
+    def __init__(self, url: str, channel_prefix: str = "user:"):
+        if aioredis is None:
+            raise RuntimeError("RedisBroker requires the redis package: "
+                               "pip install websocket-sse-server[redis]")
+        self.channel_prefix = channel_prefix
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        # The pub/sub connection only exists after the first subscribe
+        self._subscribed = asyncio.Event()
+        self._listener: Optional[asyncio.Task] = None
+        # Deliveries in progress, run apart from the listener so one stuck
+        # client cannot hold up the relay for everyone else
+        self._deliveries: Set[asyncio.Task] = set()
+
+    def _channel(self, user_id: str) -> str:
+        return self.channel_prefix + user_id
+
+    def start(self, deliver: DeliverCallback) -> None:
+        """Start relaying messages for subscribed users to ``deliver``."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(deliver))
+
+    async def stop(self) -> None:
+        """Stop the relay and close the Redis connections."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                contextual_logger.error(f"Redis relay failed before stop: {e}", error=str(e))
+            self._listener = None
+        for task in self._deliveries:
+            task.cancel()
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+        try:
+            await self._pubsub.aclose()
+        finally:
+            await self._redis.aclose()
+
+    async def publish(self, user_id: str, payload: str) -> bool:
+        """Publish a serialized message for a user; False if no worker holds the user."""
+        receivers = await self._redis.publish(self._channel(user_id), payload)
+        return int(receivers) > 0
+
+    async def subscribe(self, user_id: str) -> None:
+        """Receive messages for a user connected to this worker."""
+        await self._pubsub.subscribe(self._channel(user_id))
+        self._subscribed.set()
+
+    async def unsubscribe(self, user_id: str) -> None:
+        """Stop receiving messages for a user that left this worker."""
+        await self._pubsub.unsubscribe(self._channel(user_id))
+
+    async def _listen(self, deliver: DeliverCallback) -> None:
+        """Relay published messages to the local connections.
+
+        Connection errors are retried with a doubling delay; the pub/sub client
+        reconnects and restores its subscriptions on the next read.
+        """
+        await self._subscribed.wait()
+        prefix_length = len(self.channel_prefix)
+        retry_delay = LISTEN_RETRY_INITIAL_SECONDS
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=None)
+            except Exception as e:
+                contextual_logger.error(f"Error receiving from Redis, retrying in {retry_delay}s: {e}",
+                                        retry_delay=retry_delay, error=str(e))
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, LISTEN_RETRY_MAX_SECONDS)
+                continue
+            retry_delay = LISTEN_RETRY_INITIAL_SECONDS
+            if message is None or message.get("type") != "message":
+                continue
+            try:
+                user_id = message["channel"][prefix_length:]
+                payload = message["data"]
+            except (KeyError, TypeError) as e:
+                contextual_logger.error(f"Skipping malformed pub/sub message: {e!r}", error=repr(e))
+                continue
+            # Tasks start in order, so messages for one user are still queued in order
+            task = asyncio.create_task(self._relay(deliver, user_id, payload))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _relay(self, deliver: DeliverCallback, user_id: str, payload: str) -> None:
+        """Deliver one published message to a local connection."""
+        try:
+            await deliver(user_id, payload)
+        except Exception as e:
+            contextual_logger.error(f"Error relaying published message to user {user_id}: {e}",
+                                    user_id=user_id, error=str(e))
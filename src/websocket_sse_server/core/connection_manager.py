@@ -1,122 +1,365 @@
 """WebSocket connection manager."""
 
 import asyncio
-from typing import Dict, Optional, Set
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
 from fastapi import WebSocket
 from loguru import logger
-from ..utils.exceptions import DuplicateConnectionError
+from ..utils.compat import timeout
+from ..utils.exceptions import ConnectionLimitError, DuplicateConnectionError
 from ..utils.logger import contextual_logger
+from ..utils.serialization import dumps
+
+
+# Maximum number of messages queued behind an in-flight send for one connection
+OUTBOUND_QUEUE_MAXSIZE = 1024
+
+# How long closing an evicted connection may take before it is abandoned (in seconds)
+EVICT_CLOSE_TIMEOUT_SECONDS = 5.0
+
+# A queued serialized JSON text frame and the sender waiting for its outcome
+_Queued = Tuple[str, "asyncio.Future[bool]"]
+
+
+def _settle(items: List[_Queued], sent: bool) -> None:
+    """Report the outcome to each sender of a queued message."""
+    for _, future in items:
+        # The sender may have given up waiting (e.g. a batch timeout)
+        if not future.done():
+            future.set_result(sent)
+
+
+class _Outbox:
+    """Outbound state for one WebSocket connection.
+
+    A message is sent inline when the connection is idle. While a send is in
+    flight, further messages are queued and a writer task drains them in order,
+    so a slow client never has more than one send outstanding. Senders of
+    queued messages wait for the writer, and learn of a dropped connection.
+    """
+
+    __slots__ = ("websocket", "queue", "busy", "writer")
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[_Queued]" = asyncio.Queue(maxsize=OUTBOUND_QUEUE_MAXSIZE)
+        self.busy = False
+        self.writer: Optional[asyncio.Task] = None
 
 
 class ConnectionManager:
     """Manages WebSocket connections indexed by user_id."""
 
-    def __init__(self):
+    def __init__(self, batch_max_size: int = 1, max_connections: int = 0,
+                 connect_wait_timeout: float = 10.0):
+        # Queued messages merged into one {"batch": [...]} frame by the writer; 1 disables batching
+        self.batch_max_size = max(1, batch_max_size)
+        # Admission limit on open connections; 0 disables it. The connection count
+        # itself is the slot counter, so there is no separate count to drift
+        self.max_connections = max(0, max_connections)
+        # How long connect waits for a free slot before raising ConnectionLimitError
+        self.connect_wait_timeout = connect_wait_timeout
+        # Connects waiting for a slot, woken one at a time as connections close
+        self._slot_waiters: Deque[asyncio.Future] = deque()
+        # Only touched from the event loop, and never across an await between a
+        # check and the matching update, so no lock is needed
         self.connections: Dict[str, WebSocket] = {}
-        # Use separate locks for different operations to reduce contention
-        self._connect_lock = asyncio.Lock()  # Only for connection operations
-        self._access_lock = asyncio.Lock()   # For read/write operations
+        self._outboxes: Dict[str, _Outbox] = {}
+        # Background closes of evicted connections, referenced until they finish
+        self._closing: Set[asyncio.Task] = set()
 
     async def connect(self, user_id: str, websocket: WebSocket) -> None:
-        """Establish a WebSocket connection for a user."""
-        async with self._connect_lock:
-            if user_id in self.connections:
+        """Establish a WebSocket connection for a user.
+
+        With a connection limit set, waits up to connect_wait_timeout for a free
+        slot and raises ConnectionLimitError if none frees up.
+        """
+        connections = self.connections
+        if self.max_connections and len(connections) >= self.max_connections:
+            if user_id in connections:
                 raise DuplicateConnectionError(user_id)
-            self.connections[user_id] = websocket
-            contextual_logger.info("User connected", user_id=user_id)
-
-    async def disconnect(self, user_id: str) -> None:
-        """Disconnect a user's WebSocket connection."""
-        async with self._access_lock:
-            if user_id in self.connections:
-                del self.connections[user_id]
-                contextual_logger.info("User disconnected", user_id=user_id)
-            else:
-                contextual_logger.warning("Attempt to disconnect non-existent user", user_id=user_id)
+            await self._wait_for_slot(user_id)
+        count = len(connections)
+        # Check and claim the user_id in a single dict probe; the size is unchanged
+        # if the user was already connected
+        connections.setdefault(user_id, websocket)
+        if len(connections) == count:
+            raise DuplicateConnectionError(user_id)
+        self._outboxes[user_id] = _Outbox(websocket)
+        contextual_logger.info("User connected", user_id=user_id)
+
+    async def _wait_for_slot(self, user_id: str) -> None:
+        """Wait until the connection count is below the limit."""
+        loop = asyncio.get_running_loop()
+        try:
+            async with timeout(self.connect_wait_timeout):
+                while self.max_connections and len(self.connections) >= self.max_connections:
+                    waiter = loop.create_future()
+                    self._slot_waiters.append(waiter)
+                    try:
+                        await waiter
+                    except BaseException:
+                        waiter.cancel()
+                        # Pass the wake-up on if a slot was freed for this waiter
+                        if not self.max_connections or len(self.connections) < self.max_connections:
+                            self._wake_slot_waiter()
+                        raise
+        except asyncio.TimeoutError:
+            contextual_logger.warning("Connection limit reached, rejecting connection", user_id=user_id)
+            raise ConnectionLimitError(user_id) from None
+
+    def _wake_slot_waiter(self) -> None:
+        """Wake the next connect waiting for a slot, if any."""
+        waiters = self._slot_waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def set_max_connections(self, max_connections: int) -> None:
+        """Change the connection limit; 0 disables it.
+
+        Raising the limit admits waiting connects right away. Lowering it below
+        the current count closes nothing, new connects wait until enough close.
+        """
+        self.max_connections = max(0, max_connections)
+        free = len(self._slot_waiters)
+        if self.max_connections:
+            free = min(free, self.max_connections - len(self.connections))
+        for _ in range(free):
+            self._wake_slot_waiter()
+
+    async def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None) -> None:
+        """Disconnect a user's WebSocket connection.
+
+        With ``websocket`` given, only that connection is removed, so the endpoint
+        of a dropped connection cannot remove the user's newer one.
+        """
+        if websocket is not None and self.connections.get(user_id) is not websocket:
+            contextual_logger.warning("Attempt to disconnect non-existent user", user_id=user_id)
+            return
+        if self.connections.pop(user_id, None) is not None:
+            self._close_outbox(user_id)
+            self._wake_slot_waiter()
+            contextual_logger.info("User disconnected", user_id=user_id)
+        else:
+            contextual_logger.warning("Attempt to disconnect non-existent user", user_id=user_id)
+
+    def _close_outbox(self, user_id: str) -> None:
+        """Drop a user's outbox, failing queued messages and stopping its writer."""
+        outbox = self._outboxes.pop(user_id, None)
+        if outbox is None:
+            return
+        if outbox.writer is not None:
+            outbox.writer.cancel()
+        queue = outbox.queue
+        _settle([queue.get_nowait() for _ in range(queue.qsize())], False)
+
+    def _evict(self, user_id: str, websocket: WebSocket) -> None:
+        """Remove and close a failed connection, unless the user reconnected in the meantime."""
+        if self.connections.get(user_id) is websocket:
+            self.connections.pop(user_id, None)
+            self._close_outbox(user_id)
+            self._wake_slot_waiter()
+            # Close in the background: the failed send may still hold the socket
+            task = asyncio.create_task(self._close_evicted(user_id, websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close_evicted(self, user_id: str, websocket: WebSocket) -> None:
+        """Close an evicted connection so the client notices and can reconnect."""
+        try:
+            async with timeout(EVICT_CLOSE_TIMEOUT_SECONDS):
+                await websocket.close(code=1011, reason="Send failed")
+        except Exception as e:
+            contextual_logger.warning(f"Error closing evicted websocket for user {user_id}: {e!r}",
+                                      user_id=user_id, error=repr(e))
+
+    async def _deliver(self, user_id: str, outbox: _Outbox, payload: str) -> bool:
+        """Send inline if the connection is idle, otherwise queue behind the in-flight send.
+
+        Returns False if the message was dropped because the outbound queue is
+        full, or the connection was dropped before a queued message went out.
+        Errors from an inline send are raised to the caller, after the
+        connection is evicted.
+        """
+        if outbox.busy:
+            future: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+            try:
+                outbox.queue.put_nowait((payload, future))
+            except asyncio.QueueFull:
+                contextual_logger.warning("Outbound queue full, dropping message", user_id=user_id)
+                return False
+            return await future
+
+        outbox.busy = True
+        try:
+            await outbox.websocket.send_text(payload)
+        except BaseException:
+            outbox.busy = False
+            # A failed or cancelled send leaves the connection in an unknown state, and
+            # messages queued behind it have no writer, so drop the connection
+            self._evict(user_id, outbox.websocket)
+            raise
+
+        # Hand anything queued during the send to a writer task
+        if outbox.queue.empty() or self._outboxes.get(user_id) is not outbox:
+            outbox.busy = False
+        else:
+            outbox.writer = asyncio.create_task(self._drain_outbox(user_id, outbox))
+        return True
+
+    async def _drain_outbox(self, user_id: str, outbox: _Outbox) -> None:
+        """Send queued messages in order until the outbox is empty.
+
+        With batching enabled, up to batch_max_size queued messages go out as a
+        single {"batch": [...]} frame.
+        """
+        queue = outbox.queue
+        batch: List[_Queued] = []
+        try:
+            while not queue.empty():
+                batch = [queue.get_nowait()]
+                while len(batch) < self.batch_max_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+                if len(batch) == 1:
+                    payload = batch[0][0]
+                else:
+                    # Items are already JSON, so the envelope is built without re-serializing
+                    payload = '{"batch":[' + ",".join(item for item, _ in batch) + ']}'
+                try:
+                    await outbox.websocket.send_text(payload)
+                except Exception as e:
+                    contextual_logger.error(f"Error sending queued message to user {user_id}: {e}",
+                                            user_id=user_id, error=str(e))
+                    # Detach first so evicting does not cancel this task
+                    outbox.writer = None
+                    self._evict(user_id, outbox.websocket)
+                    break
+                _settle(batch, True)
+                batch = []
+        finally:
+            # A batch still held here was cut off by an error or cancellation
+            _settle(batch, False)
+            outbox.busy = False
+            outbox.writer = None
 
     async def send_to_user(self, user_id: str, message: dict) -> bool:
         """Send a message to a specific user."""
-        # Get the websocket reference without holding the lock during I/O
-        websocket_ref = None
-        async with self._access_lock:
-            websocket_ref = self.connections.get(user_id)
+        outbox = self._outboxes.get(user_id)
 
-        if not websocket_ref:
+        if outbox is None:
             contextual_logger.warning("Attempt to send message to disconnected user", user_id=user_id)
             return False
 
         try:
-            await websocket_ref.send_json(message)
-            contextual_logger.debug("Message sent to user", user_id=user_id, message_type=type(message).__name__)
-            return True
+            payload = dumps(message)
+        except (TypeError, ValueError) as e:
+            # A message that cannot be serialized fails alone; the connection is fine
+            contextual_logger.error(f"Error sending to user {user_id}: {e}", user_id=user_id, error=str(e))
+            return False
+        return await self._send(user_id, outbox, payload)
+
+    async def send_text_to_user(self, user_id: str, payload: str) -> bool:
+        """Send an already serialized JSON message to a specific user."""
+        outbox = self._outboxes.get(user_id)
+
+        if outbox is None:
+            contextual_logger.warning("Attempt to send message to disconnected user", user_id=user_id)
+            return False
+
+        return await self._send(user_id, outbox, payload)
+
+    async def _send(self, user_id: str, outbox: _Outbox, payload: str) -> bool:
+        """Deliver a serialized message, evicting the connection if the send fails."""
+        try:
+            sent = await self._deliver(user_id, outbox, payload)
+            if sent and contextual_logger.debug_enabled():
+                contextual_logger.debug("Message sent to user", user_id=user_id)
+            return sent
         except Exception as e:
             contextual_logger.error(f"Error sending to user {user_id}: {e}", user_id=user_id, error=str(e))
             # Remove the user from connections to prevent further attempts
-            async with self._access_lock:
-                # Double-check the connection still exists and belongs to this user
-                if self.connections.get(user_id) == websocket_ref:
-                    del self.connections[user_id]
+            self._evict(user_id, outbox.websocket)
             return False
 
     async def broadcast(self, message: dict) -> int:
         """Broadcast a message to all connected users."""
-        # Get all websocket references without holding the lock during I/O
-        connections_copy = {}
-        async with self._access_lock:
-            connections_copy = self.connections.copy()
+        # Snapshot the outboxes so sends can await safely
+        snapshot = list(self._outboxes.items())
+
+        if not snapshot:
+            return 0
 
-        disconnected: Set[str] = set()
+        failed: List[Tuple[str, _Outbox]] = []
         sent_count = 0
 
-        # Process each connection without holding the lock
-        for user_id, websocket in connections_copy.items():
+        # Serialize once for all recipients
+        try:
+            payload = dumps(message)
+        except (TypeError, ValueError) as e:
+            contextual_logger.error(f"Error serializing broadcast message: {e}", error=str(e))
+            return 0
+
+        if len(snapshot) == 1:
+            # Single recipient: await directly instead of going through gather
+            user_id, outbox = snapshot[0]
             try:
-                await websocket.send_json(message)
-                sent_count += 1
+                if await self._deliver(user_id, outbox, payload):
+                    sent_count = 1
             except Exception as e:
                 contextual_logger.error(f"Error broadcasting to user {user_id}: {e}", user_id=user_id, error=str(e))
-                disconnected.add(user_id)
+                failed.append((user_id, outbox))
+        else:
+            # Send to all connections concurrently
+            results = await asyncio.gather(
+                *(self._deliver(user_id, outbox, payload) for user_id, outbox in snapshot),
+                return_exceptions=True
+            )
+            for (user_id, outbox), result in zip(snapshot, results):
+                if isinstance(result, Exception):
+                    contextual_logger.error(f"Error broadcasting to user {user_id}: {result}",
+                                            user_id=user_id, error=str(result))
+                    failed.append((user_id, outbox))
+                elif result:
+                    sent_count += 1
 
         # Remove disconnected users from the main dictionary
-        if disconnected:
-            async with self._access_lock:
-                for user_id in disconnected:
-                    # Double-check the connection still exists and is the same object
-                    if user_id in self.connections and self.connections[user_id] == connections_copy[user_id]:
-                        del self.connections[user_id]
-
-        contextual_logger.info(f"Broadcast completed: {sent_count} sent, {len(disconnected)} failed",
-                              sent_count=sent_count, failed_count=len(disconnected))
+        for user_id, outbox in failed:
+            self._evict(user_id, outbox.websocket)
+
+        contextual_logger.info(f"Broadcast completed: {sent_count} sent, {len(failed)} failed",
+                              sent_count=sent_count, failed_count=len(failed))
         return sent_count
 
     def get_connection_count(self) -> int:
         """Get the number of active connections."""
-        async def _get_count():
-            async with self._access_lock:
-                return len(self.connections)
-        # Since this is called from sync context, we can't use async
-        # So we'll use a simple approach that might be slightly inconsistent
-        # but won't block other operations
-        count = len(self.connections)
-        contextual_logger.debug("Connection count retrieved", count=count)
-        return count
+        return len(self.connections)
 
     async def cleanup(self) -> None:
         """Clean up all connections."""
-        connections_to_close = {}
-        async with self._access_lock:
-            connections_to_close = self.connections.copy()
-            self.connections.clear()
+        connections_to_close = self.connections.copy()
+        self.connections.clear()
+        for user_id in list(self._outboxes):
+            self._close_outbox(user_id)
+        while self._slot_waiters:
+            self._wake_slot_waiter()
+
+        # Close connections concurrently
+        items = list(connections_to_close.items())
+        results = await asyncio.gather(
+            *(websocket.close(code=1001, reason="Server shutdown") for _, websocket in items),
+            return_exceptions=True
+        )
 
-        # Close connections without holding the lock
         closed_count = 0
-        for user_id, websocket in connections_to_close.items():
-            try:
-                await websocket.close(code=1001, reason="Server shutdown")
+        for (user_id, _), result in zip(items, results):
+            if isinstance(result, Exception):
+                contextual_logger.warning(f"Error closing websocket for user {user_id}: {result}",
+                                         user_id=user_id, error=str(result))
+            else:
                 closed_count += 1
-            except Exception as e:
-                contextual_logger.warning(f"Error closing websocket for user {user_id}: {e}",
-                                         user_id=user_id, error=str(e))
 
         contextual_logger.info(f"Cleanup completed: {closed_count} connections closed",
                               closed_count=closed_count)
@@ -1,6 +1,6 @@
 """Message routing logic for WebSocket SSE Server."""
 
-from typing import Optional
+from typing import Awaitable, Callable
 from ..core.connection_manager import ConnectionManager
 from ..core.sse_handler import SSEHandler
 from ..utils.logger import logger
@@ -12,10 +12,10 @@ class MessageRouter:
     def __init__(self, connection_manager: ConnectionManager, sse_handler: SSEHandler):
         self.connection_manager = connection_manager
         self.sse_handler = sse_handler
-
-    async def route_sse_to_websocket(self, user_id: str, message: dict) -> bool:
-        """Route SSE message to WebSocket connection."""
-        return await self.connection_manager.send_to_user(user_id, message)
+        # Pure delegations are bound directly to skip a wrapper coroutine per call:
+        # route SSE messages to a WebSocket connection, and broadcast to all clients
+        self.route_sse_to_websocket: Callable[[str, dict], Awaitable[bool]] = connection_manager.send_to_user
+        self.broadcast_to_all: Callable[[dict], Awaitable[int]] = connection_manager.broadcast
 
     async def route_websocket_to_sse(self, user_id: str, message: dict) -> None:
         """Route WebSocket message to SSE handler (for future bidirectional support)."""
@@ -23,10 +23,6 @@ class MessageRouter:
         # Future: Implement bidirectional message handling if needed
         pass
 
-    async def broadcast_to_all(self, message: dict) -> None:
-        """Broadcast message to all connected WebSocket clients."""
-        await self.connection_manager.broadcast(message)
-
     def get_stats(self) -> dict:
         """Get routing statistics."""
         return {
@@ -0,0 +1,122 @@
+"""Response channel for request-response flows."""
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Optional
+from ..utils.exceptions import ChannelClosedError
+
+
+class ResponseChannel:
+    """Single-consumer channel used instead of asyncio.Queue.
+
+    Each correlation_id has exactly one consumer (the SSE stream), so a deque plus
+    a single wake-up future is enough. The API mirrors the subset of asyncio.Queue
+    used by the SSE endpoints, including bounded puts when ``maxsize`` is set.
+    """
+
+    __slots__ = ("maxsize", "_items", "_waiter", "_putters", "_closed")
+
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        self._items: Deque[Any] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._putters: Deque[asyncio.Future] = deque()
+        self._closed = False
+
+    def qsize(self) -> int:
+        """Number of items waiting to be consumed."""
+        return len(self._items)
+
+    def empty(self) -> bool:
+        """Return True if there are no items waiting."""
+        return not self._items
+
+    def full(self) -> bool:
+        """Return True if the channel holds maxsize items (never for maxsize 0)."""
+        return 0 < self.maxsize <= len(self._items)
+
+    def _append(self, item: Any) -> None:
+        """Append an item and wake the consumer if it is waiting."""
+        self._items.append(item)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _wake_putter(self) -> None:
+        """Wake the next producer waiting for space, if any."""
+        while self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+                break
+
+    def _popleft(self) -> Any:
+        """Pop the next item and wake a producer waiting for space."""
+        item = self._items.popleft()
+        self._wake_putter()
+        return item
+
+    def put_nowait(self, item: Any) -> None:
+        """Append an item, raising asyncio.QueueFull if the channel is full.
+
+        Raises ChannelClosedError once the channel is closed.
+        """
+        if self._closed:
+            raise ChannelClosedError
+        if self.full():
+            raise asyncio.QueueFull
+        self._append(item)
+
+    async def put(self, item: Any) -> None:
+        """Append an item, waiting for space if the channel is full.
+
+        Raises ChannelClosedError if the channel is closed, including while waiting.
+        """
+        while self.full() and not self._closed:
+            putter = asyncio.get_running_loop().create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except BaseException:
+                putter.cancel()
+                # Pass the wake-up on if space was freed for this putter
+                if not self.full():
+                    self._wake_putter()
+                raise
+        self.put_nowait(item)
+
+    def close(self) -> None:
+        """Mark the end of the stream.
+
+        Once the remaining items are consumed, get and get_nowait return the
+        None sentinel. Nothing is queued, so this never blocks or hits maxsize.
+        Producers waiting for space are woken and refused, like any later put.
+        """
+        self._closed = True
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        while self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+
+    def get_nowait(self) -> Any:
+        """Pop the next item, raising asyncio.QueueEmpty if there is none."""
+        if not self._items:
+            if self._closed:
+                return None
+            raise asyncio.QueueEmpty
+        return self._popleft()
+
+    async def get(self) -> Any:
+        """Wait for and pop the next item."""
+        while not self._items:
+            if self._closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._popleft()
@@ -1,73 +1,209 @@
 """SSE message handler."""
 
 import asyncio
-import json
 import re
 import time
 import uuid
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 from pydantic import ValidationError
 from loguru import logger
+from .broker import RedisBroker
 from .connection_manager import ConnectionManager
+from .response_channel import ResponseChannel
 from ..models.message import SSEMessage
-from ..config import is_public_account, get_public_accounts
+from ..config import is_public_account
+from ..utils.compat import timeout
+from ..utils.exceptions import ChannelClosedError
 from ..utils.logger import contextual_logger
+from ..utils.serialization import dumps, dumps_bytes
 
 
 # Default TTL for correlation entries (in seconds)
 CORRELATION_TTL_SECONDS = 300  # 5 minutes
 
+# Maximum number of correlation entries kept; the oldest is evicted beyond this
+CORRELATION_MAP_MAXSIZE = 100_000
+
+# Message data fields that may carry text with @mentions, in priority order
+_TEXT_FIELDS = ('message', 'text', 'data', 'content', 'body')
+
+# How often the background task expires correlation entries (in seconds)
+CORRELATION_CLEANUP_INTERVAL_SECONDS = 60
+
+# Matches @username (where username is alphanumeric and underscore)
+_MENTION_PATTERN = re.compile(r'@([a-zA-Z0-9_]+)')
+
+# Maximum number of undelivered responses buffered per request-response flow
+RESPONSE_QUEUE_MAXSIZE = 32
+
+# How long a WebSocket response waits for space in a full response queue (in seconds)
+RESPONSE_PUT_TIMEOUT_SECONDS = 1.0
+
+# Maximum number of coalesced /sse/push messages dispatched as one batch
+PUSH_BATCH_MAX_SIZE = 50
+
+# Request-response flows idle this long are closed by the cleanup task (in seconds);
+# covers streams whose endpoint never ran its cleanup, e.g. the client left before streaming
+REQUEST_RESPONSE_IDLE_TTL_SECONDS = 300
+
+# Maximum number of open request-response flows; the least recently active is closed beyond this
+REQUEST_RESPONSE_MAX_FLOWS = 10_000
+
+
+def _first_text(message_data: dict) -> str:
+    """Return the first string value among the text fields, or an empty string."""
+    for field in _TEXT_FIELDS:
+        value = message_data.get(field)
+        # Exact type check: str subclasses are not expected in JSON payloads
+        if type(value) is str:
+            return value
+    return ""
+
+
+def _resolve_pushes(pushes: List[Tuple[SSEMessage, "asyncio.Future[bool]"]], outcomes: List[bool]) -> None:
+    """Report the delivery outcome to each buffered push."""
+    for (_, future), success in zip(pushes, outcomes):
+        # The caller may have gone away (e.g. client disconnect)
+        if not future.done():
+            future.set_result(success)
+
 
 class SSEHandler:
     """Handles SSE messages and routes them to WebSocket connections."""
 
-    def __init__(self, connection_manager: ConnectionManager):
+    def __init__(self, connection_manager: ConnectionManager, trust_upstream: bool = False,
+                 send_timeout: Optional[float] = 5.0, broker: Optional[RedisBroker] = None):
         self.connection_manager = connection_manager
-        # Store queues for request-response flows (by correlation_id)
-        self.request_response_queues: Dict[str, asyncio.Queue] = {}
-        # Track message correlation IDs with timestamps for TTL-based cleanup
-        # Format: {correlation_id: (user_id, timestamp)}
-        self.correlation_map: Dict[str, Tuple[str, float]] = {}
-        # Lock for correlation_map operations
-        self._correlation_lock = asyncio.Lock()
-
-    async def _cleanup_expired_correlations(self) -> int:
+        # Publishes user messages for fan-out across workers; None delivers locally
+        self.broker = broker
+        # Build raw dict messages without validation (only for trusted upstreams)
+        self.trust_upstream = trust_upstream
+        # Per-message delivery limit in batches, so one stuck client cannot hold up
+        # the rest of the batch; None disables it
+        self.send_timeout = send_timeout
+        # Store response channels for request-response flows (by correlation_id)
+        self.request_response_queues: Dict[str, ResponseChannel] = {}
+        # Last activity per request-response flow, least recently active first
+        self._flow_activity: "OrderedDict[str, float]" = OrderedDict()
+        # Track message correlation IDs with timestamps for TTL-based cleanup,
+        # oldest first. Format: {correlation_id: (user_id, monotonic timestamp)}
+        self.correlation_map: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Pending pushes waiting for the in-flight dispatch to finish
+        self._push_buffer: List[Tuple[SSEMessage, "asyncio.Future[bool]"]] = []
+        self._push_dispatching = False
+        self._push_task: Optional[asyncio.Task] = None
+        # Background task expiring correlation entries (see start/stop)
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    def _cleanup_expired_correlations(self) -> int:
         """Remove expired correlation entries based on TTL.
-        
+
+        Entries are kept in insertion order with monotonic timestamps, so the
+        sweep stops at the first entry that has not expired yet.
+
         Returns:
             Number of entries cleaned up.
         """
-        current_time = time.time()
-        expired_keys = []
-        
-        async with self._correlation_lock:
-            for correlation_id, (user_id, timestamp) in self.correlation_map.items():
-                if current_time - timestamp > CORRELATION_TTL_SECONDS:
-                    expired_keys.append(correlation_id)
-            
-            for key in expired_keys:
-                del self.correlation_map[key]
-        
-        if expired_keys:
-            contextual_logger.debug(f"Cleaned up {len(expired_keys)} expired correlation entries")
-        
-        return len(expired_keys)
-
-    async def _store_correlation(self, correlation_id: str, user_id: str) -> None:
+        cutoff = time.monotonic() - CORRELATION_TTL_SECONDS
+        correlation_map = self.correlation_map
+        expired_count = 0
+        while correlation_map:
+            _, (_, timestamp) = next(iter(correlation_map.items()))
+            if timestamp >= cutoff:
+                break
+            correlation_map.popitem(last=False)
+            expired_count += 1
+
+        if expired_count:
+            contextual_logger.debug(f"Cleaned up {expired_count} expired correlation entries")
+
+        return expired_count
+
+    def _cleanup_idle_flows(self) -> int:
+        """Close request-response flows with no activity within the idle TTL.
+
+        Returns:
+            Number of flows closed.
+        """
+        cutoff = time.monotonic() - REQUEST_RESPONSE_IDLE_TTL_SECONDS
+        flow_activity = self._flow_activity
+        closed_count = 0
+        while flow_activity:
+            correlation_id, last_active = next(iter(flow_activity.items()))
+            if last_active >= cutoff:
+                break
+            self._close_flow(correlation_id)
+            closed_count += 1
+
+        if closed_count:
+            contextual_logger.warning(f"Closed {closed_count} idle request-response flows",
+                                      closed_count=closed_count)
+
+        return closed_count
+
+    async def _cleanup_loop(self) -> None:
+        """Expire correlation entries and idle flows periodically, off the message path."""
+        while True:
+            await asyncio.sleep(CORRELATION_CLEANUP_INTERVAL_SECONDS)
+            try:
+                self._cleanup_expired_correlations()
+                self._cleanup_idle_flows()
+            except Exception as e:
+                contextual_logger.error(f"Error cleaning up correlation entries: {e}", error=str(e))
+
+    def start(self) -> None:
+        """Start background maintenance tasks, and the broker relay if one is set."""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        if self.broker is not None:
+            self.broker.start(self.connection_manager.send_text_to_user)
+
+    async def stop(self) -> None:
+        """Stop background maintenance tasks, pending pushes and the broker relay."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+        if self._push_task is not None:
+            self._push_task.cancel()
+            try:
+                await self._push_task
+            except asyncio.CancelledError:
+                pass
+        # Pushes still buffered will never be dispatched
+        _resolve_pushes(self._push_buffer, [False] * len(self._push_buffer))
+        self._push_buffer.clear()
+        if self.broker is not None:
+            await self.broker.stop()
+
+    async def user_connected(self, user_id: str) -> None:
+        """Route messages published for a user to this worker."""
+        if self.broker is not None:
+            await self.broker.subscribe(user_id)
+
+    async def user_disconnected(self, user_id: str) -> None:
+        """Stop routing messages published for a user to this worker."""
+        if self.broker is not None:
+            await self.broker.unsubscribe(user_id)
+
+    def _store_correlation(self, correlation_id: str, user_id: str) -> None:
         """Store a correlation entry with timestamp for TTL tracking."""
-        async with self._correlation_lock:
-            self.correlation_map[correlation_id] = (user_id, time.time())
-        
-        # Periodically cleanup expired entries (every 100 new entries)
-        if len(self.correlation_map) % 100 == 0:
-            await self._cleanup_expired_correlations()
-
-    async def _remove_correlation(self, correlation_id: str) -> None:
+        if correlation_id in self.correlation_map:
+            # Re-used id: refresh its position so the map stays ordered by timestamp
+            self.correlation_map.move_to_end(correlation_id)
+        self.correlation_map[correlation_id] = (user_id, time.monotonic())
+        # Bound memory between TTL sweeps when messages arrive faster than they expire
+        if len(self.correlation_map) > CORRELATION_MAP_MAXSIZE:
+            self.correlation_map.popitem(last=False)
+
+    def _remove_correlation(self, correlation_id: str) -> None:
         """Remove a correlation entry after it's been used."""
-        async with self._correlation_lock:
-            if correlation_id in self.correlation_map:
-                del self.correlation_map[correlation_id]
-                contextual_logger.debug("Removed correlation entry", correlation_id=correlation_id)
+        if self.correlation_map.pop(correlation_id, None) is not None:
+            contextual_logger.debug("Removed correlation entry", correlation_id=correlation_id)
 
     def _get_correlation_user(self, correlation_id: str) -> Optional[str]:
         """Get user_id from correlation map (synchronous, for quick lookups)."""
@@ -76,21 +212,42 @@ class SSEHandler:
             return entry[0]  # Return user_id
         return None
 
-    async def register_request_response(self, correlation_id: str) -> asyncio.Queue:
-        """Register a request-response flow and return a queue for the response."""
-        queue = asyncio.Queue()
+    async def register_request_response(self, correlation_id: str) -> ResponseChannel:
+        """Register a request-response flow and return a channel for the response."""
+        queue = ResponseChannel(maxsize=RESPONSE_QUEUE_MAXSIZE)
         self.request_response_queues[correlation_id] = queue
+        self._touch_flow(correlation_id)
+        if len(self._flow_activity) > REQUEST_RESPONSE_MAX_FLOWS:
+            evicted_id = next(iter(self._flow_activity))
+            self._close_flow(evicted_id)
+            contextual_logger.warning("Too many request-response flows, closed the least recently active",
+                                      correlation_id=evicted_id)
         contextual_logger.info("Registered request-response flow", correlation_id=correlation_id)
         return queue
 
     async def unregister_request_response(self, correlation_id: str):
         """Unregister a request-response flow."""
-        if correlation_id in self.request_response_queues:
-            # Put sentinel value to close the response stream
-            await self.request_response_queues[correlation_id].put(None)
-            del self.request_response_queues[correlation_id]
+        if self._close_flow(correlation_id):
             contextual_logger.info("Unregistered request-response flow", correlation_id=correlation_id)
 
+    def _touch_flow(self, correlation_id: str) -> None:
+        """Record activity on a request-response flow."""
+        self._flow_activity[correlation_id] = time.monotonic()
+        self._flow_activity.move_to_end(correlation_id)
+
+    def _close_flow(self, correlation_id: str) -> bool:
+        """Remove a request-response flow and close its channel.
+
+        Returns False if no flow was registered under the correlation_id.
+        """
+        self._flow_activity.pop(correlation_id, None)
+        queue = self.request_response_queues.pop(correlation_id, None)
+        if queue is None:
+            return False
+        # Close the response stream; a waiting consumer gets the None sentinel
+        queue.close()
+        return True
+
     async def send_to_sse_client(self, user_id: str, message: dict) -> bool:
         """Send a message to an SSE client (currently only used for request-response flows)."""
         # This method is kept for potential future use or for request-response flows
@@ -98,51 +255,102 @@ class SSEHandler:
         contextual_logger.debug("Sending message to SSE client (placeholder)", user_id=user_id)
         return False
 
-    async def send_to_request_response(self, correlation_id: str, response: dict) -> bool:
-        """Send a response to a specific request-response flow."""
-        if correlation_id in self.request_response_queues:
-            try:
-                # Convert response to JSON string
-                response_str = json.dumps(response)
-                await self.request_response_queues[correlation_id].put(response_str)
-                contextual_logger.debug("Sent response to request-response queue", correlation_id=correlation_id)
-                return True
-            except Exception as e:
-                contextual_logger.error(f"Error sending to request-response queue {correlation_id}: {e}",
-                                       correlation_id=correlation_id, error=str(e))
-                return False
-        else:
+    async def send_to_request_response(self, correlation_id: str, response: dict,
+                                       raw: Optional[bytes] = None) -> bool:
+        """Send a response to a specific request-response flow.
+
+        ``raw`` may carry ``response`` already encoded as JSON to skip re-serializing it.
+        """
+        queue = self.request_response_queues.get(correlation_id)
+        if queue is None:
             contextual_logger.warning("Attempt to send response to non-existent request-response flow",
                                      correlation_id=correlation_id)
-        return False
+            return False
+        return await self._put_response(queue, correlation_id, response, raw)
 
-    async def process_sse_message(self, raw_message: dict) -> bool:
-        """Process an SSE message from upstream."""
+    async def _put_response(self, queue: ResponseChannel, correlation_id: str, response: dict,
+                            raw: Optional[bytes]) -> bool:
+        """Encode a response and put it on a request-response channel."""
+        try:
+            # Encode once here so the SSE stream can write the bytes as-is. Raw
+            # frames with line breaks are re-encoded since they would split the SSE event
+            if raw is not None and b"\n" not in raw and b"\r" not in raw:
+                response_bytes = raw
+            else:
+                response_bytes = dumps_bytes(response)
+            try:
+                queue.put_nowait(response_bytes)
+            except asyncio.QueueFull:
+                # Slow SSE consumer: wait briefly for space, then drop the response
+                try:
+                    async with timeout(RESPONSE_PUT_TIMEOUT_SECONDS):
+                        await queue.put(response_bytes)
+                except asyncio.TimeoutError:
+                    contextual_logger.warning("Dropped response for slow request-response consumer",
+                                              correlation_id=correlation_id)
+                    return False
+            if correlation_id in self._flow_activity:
+                self._touch_flow(correlation_id)
+            if contextual_logger.debug_enabled():
+                contextual_logger.debug("Sent response to request-response queue", correlation_id=correlation_id)
+            return True
+        except ChannelClosedError:
+            # The flow was closed before or while waiting for space
+            if contextual_logger.debug_enabled():
+                contextual_logger.debug("Dropped response for closed request-response flow",
+                                        correlation_id=correlation_id)
+            return False
+        except Exception as e:
+            contextual_logger.error(f"Error sending to request-response queue {correlation_id}: {e}",
+                                   correlation_id=correlation_id, error=str(e))
+            return False
+
+    @staticmethod
+    def _message_user_id(raw_message: Union[SSEMessage, dict]) -> Optional[str]:
+        """Get the user_id of a validated or raw message."""
+        if isinstance(raw_message, SSEMessage):
+            return raw_message.user_id
+        return raw_message.get("user_id")
+
+    async def process_sse_message(self, raw_message: Union[SSEMessage, dict]) -> bool:
+        """Process an SSE message from upstream.
+
+        Messages already validated by the API layer are used as-is; raw dicts
+        are validated here unless the upstream is trusted.
+        """
         try:
             # Validate message format
-            message = SSEMessage(**raw_message)
+            if isinstance(raw_message, SSEMessage):
+                message = raw_message
+            elif self.trust_upstream:
+                message = SSEMessage.model_construct(**raw_message)
+            else:
+                message = SSEMessage.model_validate(raw_message)
 
             # Extract user_id
             original_user_id = message.user_id
 
             # Check if the message contains @public_account pattern
-            target_user_id, original_sender_info = self._extract_target_and_sender(original_user_id, message.data)
-
-            # Add original sender info to the message data to ensure public accounts know who sent the message
-            message.data['original_sender'] = original_sender_info
-
-            # Add user_id to the message data to ensure WebSocket clients know which user this is for
-            # This preserves the original behavior while adding the new functionality
-            message.data['user_id'] = original_user_id
+            target_user_id = self._extract_target(original_user_id, message.data)
 
+            data = message.data
             # Add correlation ID if not present
-            correlation_id = message.data.get('correlation_id')
-            if not correlation_id:
-                correlation_id = str(uuid.uuid4())
-                message.data['correlation_id'] = correlation_id
+            correlation_id = data.get('correlation_id') or uuid.uuid4().hex
+
+            data.update({
+                # Original sender info ensures public accounts know who sent the message.
+                # Clients rely on it even when the message routes back to its sender, so it is always set
+                'original_sender': {
+                    'user_id': original_user_id,
+                    'timestamp': data.get('timestamp')
+                },
+                # user_id ensures WebSocket clients know which user this is for
+                'user_id': original_user_id,
+                'correlation_id': correlation_id,
+            })
 
             # Store correlation for tracking responses (with TTL)
-            await self._store_correlation(correlation_id, target_user_id)
+            self._store_correlation(correlation_id, target_user_id)
 
             # Log the message routing
             contextual_logger.info("Processing SSE message",
@@ -150,16 +358,20 @@ class SSEHandler:
                                   target_user_id=target_user_id,
                                   correlation_id=correlation_id)
 
-            # Send to WebSocket connection
-            ws_success = await self.connection_manager.send_to_user(
-                target_user_id,
-                message.data
-            )
+            # Send to WebSocket connection, through the broker when the user may be on another worker
+            if self.broker is not None:
+                ws_success = await self.broker.publish(target_user_id, dumps(message.data))
+            else:
+                ws_success = await self.connection_manager.send_to_user(
+                    target_user_id,
+                    message.data
+                )
 
             if ws_success:
-                contextual_logger.debug("SSE message delivered successfully",
-                                      target_user_id=target_user_id,
-                                      correlation_id=correlation_id)
+                if contextual_logger.debug_enabled():
+                    contextual_logger.debug("SSE message delivered successfully",
+                                          target_user_id=target_user_id,
+                                          correlation_id=correlation_id)
             else:
                 contextual_logger.warning("Failed to deliver SSE message",
                                         target_user_id=target_user_id,
@@ -175,9 +387,9 @@ class SSEHandler:
             contextual_logger.error(f"Error processing SSE message: {e}", error=str(e), raw_message=raw_message)
             return False
 
-    def _extract_target_and_sender(self, original_user_id: str, message_data: dict) -> Tuple[str, dict]:
+    def _extract_target(self, original_user_id: str, message_data: dict) -> str:
         """
-        Extract target user ID and original sender info from message.
+        Extract the target user ID from a message.
 
         Checks if the message contains @public_account pattern and updates target accordingly.
 
@@ -186,120 +398,159 @@ class SSEHandler:
             message_data: The message data
 
         Returns:
-            A tuple of (target_user_id, original_sender_info)
+            The target user ID
         """
-        # Prepare original sender info
-        original_sender_info = {
-            'user_id': original_user_id,
-            'timestamp': message_data.get('timestamp')
-        }
-
         # Check if the message data contains text that might have @mentions
-        message_text = ""
-        if isinstance(message_data.get('message'), str):
-            message_text = message_data['message']
-        elif isinstance(message_data.get('text'), str):
-            message_text = message_data['text']
-        elif isinstance(message_data.get('data'), str):
-            message_text = message_data['data']
-        elif isinstance(message_data, dict):
-            # Look for common fields that might contain text
-            for field in ['message', 'text', 'content', 'body']:
-                if isinstance(message_data.get(field), str):
-                    message_text = message_data[field]
-                    break
-
-        # Find @mentions in the message text
-        if message_text:
-            # Regex pattern to match @username (where username is alphanumeric and underscore)
-            pattern = r'@([a-zA-Z0-9_]+)'
-            matches = re.findall(pattern, message_text)
+        message_text = _first_text(message_data)
 
+        # Find @mentions in the message text; most messages have no '@' at all
+        if '@' in message_text:
             # Check if any matched username is a public account
-            for matched_account in matches:
+            for match in _MENTION_PATTERN.finditer(message_text):
+                matched_account = match.group(1)
                 if is_public_account(matched_account):
                     contextual_logger.info(f"Detected @mention of public account '{matched_account}' from user '{original_user_id}'",
                                           matched_account=matched_account,
                                           original_user_id=original_user_id)
-                    return matched_account, original_sender_info
+                    return matched_account
 
         # If no public account mentioned, return original user_id
-        contextual_logger.debug("Using original user for message routing",
-                               original_user_id=original_user_id)
-        return original_user_id, original_sender_info
+        if contextual_logger.debug_enabled():
+            contextual_logger.debug("Using original user for message routing",
+                                   original_user_id=original_user_id)
+        return original_user_id
+
+    async def _process_batch_message(self, raw_message: Union[SSEMessage, dict]) -> bool:
+        """Process one message of a batch, giving up after send_timeout."""
+        if self.send_timeout is None:
+            return await self.process_sse_message(raw_message)
+        try:
+            async with timeout(self.send_timeout):
+                return await self.process_sse_message(raw_message)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Delivery timed out after {self.send_timeout}s") from None
 
     async def process_batch_sse_messages(self, raw_messages: list) -> list:
         """Process multiple SSE messages concurrently for better performance."""
         if not raw_messages:
             return []
 
-        # Create tasks for concurrent processing
-        async def process_with_index(idx: int, raw_message: dict) -> dict:
-            """Process a single message and return result with index."""
+        results: List[Union[bool, BaseException]]
+        if len(raw_messages) == 1:
+            # Single message: await directly instead of going through gather
             try:
-                success = await self.process_sse_message(raw_message)
-                return {
-                    "index": idx,
-                    "user_id": raw_message.get("user_id"),
-                    "success": success
-                }
+                results = [await self._process_batch_message(raw_messages[0])]
             except Exception as e:
-                contextual_logger.error(f"Error processing batch message at index {idx}: {e}",
-                                       index=idx, error=str(e))
-                return {
-                    "index": idx,
-                    "user_id": raw_message.get("user_id"),
-                    "success": False,
-                    "error": str(e)
-                }
-
-        # Execute all message processing concurrently
-        tasks = [
-            process_with_index(idx, raw_message)
-            for idx, raw_message in enumerate(raw_messages)
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+                results = [e]
+        else:
+            # gather (not TaskGroup) so one failure doesn't cancel the rest of the batch;
+            # it preserves input order, so results line up with raw_messages
+            results = await asyncio.gather(
+                *(self._process_batch_message(raw_message) for raw_message in raw_messages),
+                return_exceptions=True
+            )
 
-        # Handle any unexpected exceptions from gather
         processed_results = []
-        for idx, result in enumerate(results):
-            if isinstance(result, Exception):
-                contextual_logger.error(f"Unexpected error in batch processing at index {idx}: {result}",
+        for idx, (raw_message, result) in enumerate(zip(raw_messages, results)):
+            if isinstance(result, BaseException):
+                contextual_logger.error(f"Error processing batch message at index {idx}: {result}",
                                        index=idx, error=str(result))
                 processed_results.append({
                     "index": idx,
-                    "user_id": raw_messages[idx].get("user_id") if idx < len(raw_messages) else None,
+                    "user_id": self._message_user_id(raw_message),
                     "success": False,
                     "error": str(result)
                 })
             else:
-                processed_results.append(result)
-
-        # Sort by index to maintain order
-        processed_results.sort(key=lambda x: x["index"])
+                processed_results.append({
+                    "index": idx,
+                    "user_id": self._message_user_id(raw_message),
+                    "success": result
+                })
 
+        # One summary record per batch rather than one per message
+        failed = [r for r in processed_results if not r["success"]]
         contextual_logger.info(f"Batch processing completed: {len(processed_results)} messages",
                               total=len(processed_results),
-                              successful=sum(1 for r in processed_results if r.get("success")))
+                              successful=len(processed_results) - len(failed),
+                              failed=len(failed),
+                              sample_failed=[r["user_id"] for r in failed[:5]])
 
         return processed_results
 
-    async def forward_websocket_response_to_sse(self, user_id: str, response_data: dict) -> bool:
-        """Forward a WebSocket response back to the SSE client."""
+    async def push_sse_message(self, message: SSEMessage) -> bool:
+        """Process a pushed SSE message, coalescing concurrent pushes.
+
+        When nothing is in flight the push is dispatched straight away, within
+        send_timeout like a batch message. Pushes arriving while a dispatch is in
+        flight are buffered and flushed together through process_batch_sse_messages
+        once it completes. Either way a push that times out reports False.
+        """
+        if self._push_dispatching:
+            future: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+            self._push_buffer.append((message, future))
+            return await future
+
+        self._push_dispatching = True
+        try:
+            return await self._process_batch_message(message)
+        except asyncio.TimeoutError as e:
+            contextual_logger.warning(f"Push to user {message.user_id} failed: {e}", user_id=message.user_id)
+            return False
+        finally:
+            if self._push_buffer:
+                self._push_task = asyncio.create_task(self._drain_push_buffer())
+            else:
+                self._push_dispatching = False
+
+    async def _drain_push_buffer(self) -> None:
+        """Dispatch buffered pushes in batches until the buffer is empty."""
+        try:
+            while self._push_buffer:
+                batch = self._push_buffer[:PUSH_BATCH_MAX_SIZE]
+                del self._push_buffer[:PUSH_BATCH_MAX_SIZE]
+
+                try:
+                    results = await self.process_batch_sse_messages([m for m, _ in batch])
+                    outcomes = [result["success"] for result in results]
+                except asyncio.CancelledError:
+                    # Stopped mid-batch: report the batch as undelivered
+                    _resolve_pushes(batch, [False] * len(batch))
+                    raise
+                except Exception as e:
+                    contextual_logger.error(f"Error dispatching pushed SSE messages: {e}", error=str(e))
+                    outcomes = [False] * len(batch)
+
+                _resolve_pushes(batch, outcomes)
+        finally:
+            self._push_dispatching = False
+            self._push_task = None
+
+    async def forward_websocket_response_to_sse(self, user_id: str, response_data: dict,
+                                                raw: Optional[Union[str, bytes]] = None) -> bool:
+        """Forward a WebSocket response back to the SSE client.
+
+        ``raw`` is the frame ``response_data`` was parsed from, if it is unchanged;
+        it is forwarded as-is instead of being serialized again.
+        """
         # If the response contains a correlation_id, try to send to the request-response flow
-        correlation_id = response_data.get('correlation_id')
-        if correlation_id and correlation_id in self.request_response_queues:
+        correlation_id: Optional[str] = response_data.get('correlation_id')
+        if correlation_id and (queue := self.request_response_queues.get(correlation_id)) is not None:
             # Send to the specific request-response flow
-            success = await self.send_to_request_response(correlation_id, response_data)
-            contextual_logger.debug("Forwarded WebSocket response to SSE",
-                                  user_id=user_id,
-                                  correlation_id=correlation_id,
-                                  success=success)
+            if isinstance(raw, str):
+                raw = raw.encode("utf-8")
+            success = await self._put_response(queue, correlation_id, response_data, raw)
+            if contextual_logger.debug_enabled():
+                contextual_logger.debug("Forwarded WebSocket response to SSE",
+                                      user_id=user_id,
+                                      correlation_id=correlation_id,
+                                      success=success)
             return success
         else:
             # If no correlation_id or no matching request, we can't route the response
             # This is expected for non-request-response flows
-            contextual_logger.debug("Skipping response forwarding - no matching correlation ID",
-                                  user_id=user_id,
-                                  correlation_id=correlation_id)
+            if contextual_logger.debug_enabled():
+                contextual_logger.debug("Skipping response forwarding - no matching correlation ID",
+                                      user_id=user_id,
+                                      correlation_id=correlation_id)
             return False
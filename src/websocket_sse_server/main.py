@@ -5,25 +5,37 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from .api.websocket_endpoints import router as ws_router
 from .api.sse_endpoints import router as sse_router
+from .core.broker import RedisBroker
 from .core.connection_manager import ConnectionManager
 from .core.sse_handler import SSEHandler
 from .config import settings
 from .utils.logger import contextual_logger as logger
 
 # Global instances
-connection_manager = ConnectionManager()
-sse_handler = SSEHandler(connection_manager)
+connection_manager = ConnectionManager(
+    batch_max_size=settings.ws_batch_max_size,
+    max_connections=settings.ws_max_connections,
+    connect_wait_timeout=settings.ws_connect_wait_timeout
+)
+sse_handler = SSEHandler(
+    connection_manager,
+    trust_upstream=settings.sse_trust_upstream,
+    send_timeout=settings.sse_send_timeout or None,
+    broker=RedisBroker(settings.redis_url, settings.redis_channel_prefix) if settings.redis_url else None
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management."""
     logger.info("Starting WebSocket-SSE Server...", component="lifespan")
+    sse_handler.start()
 
     yield
 
     logger.info("Shutting down WebSocket-SSE Server...", component="lifespan")
     # Cleanup resources
+    await sse_handler.stop()
     await connection_manager.cleanup()
 
 
@@ -34,10 +46,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Allowed CORS origins, skipping empty entries left by stray commas
+_CORS_ORIGINS = tuple(origin.strip() for origin in settings.cors_origins.split(",") if origin.strip())
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[origin.strip() for origin in settings.cors_origins.split(",")],
+    allow_origins=_CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -1,12 +1,16 @@
 """Pydantic models for message validation."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Any, Optional
 
 
 class SSEMessage(BaseModel):
     """SSE message model for upstream push."""
 
+    # Unknown fields are dropped, and the handler mutates ``data`` in place without
+    # re-validation, so neither may be switched on without revisiting SSEHandler
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     user_id: str = Field(..., description="Target user ID")
     data: dict = Field(..., description="Message data payload")
     event_type: Optional[str] = Field(None, description="Event type")
@@ -17,6 +21,8 @@ class SSEMessage(BaseModel):
 class ClientMessage(BaseModel):
     """Client message model."""
 
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     type: str = Field(..., description="Message type")
     data: dict = Field(default_factory=dict, description="Message data")
     correlation_id: Optional[str] = Field(None, description="Correlation ID for request/response matching")
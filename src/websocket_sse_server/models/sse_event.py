@@ -1,12 +1,14 @@
 """SSE event models for WebSocket SSE Server."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
 
 class SSEEvent(BaseModel):
     """SSE event model for server-sent events."""
 
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     event: Optional[str] = Field(None, description="Event type")
     data: Optional[str] = Field(None, description="Event data")
     id: Optional[str] = Field(None, description="Event ID")
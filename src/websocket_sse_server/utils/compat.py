@@ -0,0 +1,10 @@
+"""Compatibility helpers for supported Python versions."""
+
+import sys
+
+if sys.version_info >= (3, 11):
+    from asyncio import timeout
+else:  # pragma: no cover - exercised only on Python 3.10
+    from async_timeout import timeout
+
+__all__ = ["timeout"]
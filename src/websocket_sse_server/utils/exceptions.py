@@ -9,6 +9,18 @@ class DuplicateConnectionError(Exception):
         super().__init__(f"User {user_id} is already connected")
 
 
+class ConnectionLimitError(Exception):
+    """Raised when no connection slot frees up before the admission wait times out."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        super().__init__(f"Connection limit reached, user {user_id} not admitted")
+
+
+class ChannelClosedError(Exception):
+    """Raised when an item is put on a response channel that has been closed."""
+
+
 class InvalidMessageError(Exception):
     """Raised when an invalid message is received."""
 
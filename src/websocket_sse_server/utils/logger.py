@@ -1,9 +1,14 @@
 """Logging configuration for the WebSocket SSE server."""
 
 import sys
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from loguru import logger
 from ..config import settings
 
+if TYPE_CHECKING:
+    # loguru only defines the Logger type in its stubs
+    from loguru import Logger
+
 # Remove default handler
 logger.remove()
 
@@ -28,46 +33,79 @@ if settings.debug:
         serialize=False,  # Keep human-readable format
     )
 
+_DEBUG_LEVEL_NO = logger.level("DEBUG").no
+_INFO_LEVEL_NO = logger.level("INFO").no
+
+# Whether any handler accepts DEBUG / INFO records, cached so disabled calls return at once
+_DEBUG_ON = False
+_INFO_ON = False
+
+
+def reload_levels(level: Optional[str] = None) -> None:
+    """Refresh the cached level flags.
+
+    The flags follow the handlers added above, from the log_level and debug
+    settings. Pass the level of a handler added elsewhere so its records are
+    not skipped; call again without it once that handler is removed.
+    """
+    global _DEBUG_ON, _INFO_ON
+    min_level = _DEBUG_LEVEL_NO if settings.debug else logger.level(settings.log_level).no
+    if level is not None:
+        min_level = min(min_level, logger.level(level).no)
+    _DEBUG_ON = min_level <= _DEBUG_LEVEL_NO
+    _INFO_ON = min_level <= _INFO_LEVEL_NO
+
+
+reload_levels()
+
+
 # Create a contextual logger that can include request-specific information
 class ContextualLogger:
     def __init__(self):
         self.logger = logger
+        # Shared logger for calls without extra context, so they skip bind()
+        self._system_logger = logger.bind(user_id='SYSTEM')
+
+    def debug_enabled(self) -> bool:
+        """Return True if any handler accepts DEBUG records.
+
+        Lets hot paths skip building debug arguments when they would be discarded.
+        """
+        return _DEBUG_ON
 
     def bind(self, **kwargs):
         """Bind context to logger"""
         return self.logger.bind(**kwargs)
 
-    def info(self, message, **kwargs):
+    def _bound(self, kwargs: Dict[str, Any]) -> "Logger":
+        """Return a logger carrying kwargs as context, with a default user_id."""
+        if not kwargs:
+            return self._system_logger
         # Ensure user_id exists in kwargs to prevent KeyError
-        if 'user_id' not in kwargs:
-            kwargs['user_id'] = 'SYSTEM'
-        return self.logger.bind(**kwargs).info(message)
+        kwargs.setdefault('user_id', 'SYSTEM')
+        return self.logger.bind(**kwargs)
+
+    def info(self, message, **kwargs):
+        if not _INFO_ON:
+            return None
+        return self._bound(kwargs).info(message)
 
     def error(self, message, **kwargs):
-        # Ensure user_id exists in kwargs to prevent KeyError
-        if 'user_id' not in kwargs:
-            kwargs['user_id'] = 'SYSTEM'
-        return self.logger.bind(**kwargs).error(message)
+        return self._bound(kwargs).error(message)
 
     def warning(self, message, **kwargs):
-        # Ensure user_id exists in kwargs to prevent KeyError
-        if 'user_id' not in kwargs:
-            kwargs['user_id'] = 'SYSTEM'
-        return self.logger.bind(**kwargs).warning(message)
+        return self._bound(kwargs).warning(message)
 
     def debug(self, message, **kwargs):
-        # Ensure user_id exists in kwargs to prevent KeyError
-        if 'user_id' not in kwargs:
-            kwargs['user_id'] = 'SYSTEM'
-        return self.logger.bind(**kwargs).debug(message)
+        # Skip binding context for records no handler would accept
+        if not _DEBUG_ON:
+            return None
+        return self._bound(kwargs).debug(message)
 
     def critical(self, message, **kwargs):
-        # Ensure user_id exists in kwargs to prevent KeyError
-        if 'user_id' not in kwargs:
-            kwargs['user_id'] = 'SYSTEM'
-        return self.logger.bind(**kwargs).critical(message)
+        return self._bound(kwargs).critical(message)
 
 # Create contextual logger instance
 contextual_logger = ContextualLogger()
 
-__all__ = ["logger", "contextual_logger"]
+__all__ = ["logger", "contextual_logger", "reload_levels"]
@@ -0,0 +1,62 @@
+"""JSON serialization helpers for the SSE/WebSocket hot paths.
+
+Uses orjson when it is installed and falls back to the stdlib json module
+otherwise, or for values orjson rejects (such as integers beyond 64 bits).
+Both produce compact UTF-8 JSON like Starlette's ``WebSocket.send_json``; the
+output is the same for plain JSON data, though float formatting may differ.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    _HAVE_ORJSON = True
+except ImportError:  # pragma: no cover - exercised only without orjson
+    _HAVE_ORJSON = False
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one name covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize an object to a JSON string with the stdlib json module."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+if _HAVE_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> str:
+        """Serialize an object to a JSON string."""
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            # orjson.JSONEncodeError subclasses TypeError; retry values only the stdlib accepts
+            return _json_dumps(obj)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize an object to UTF-8 encoded JSON bytes."""
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except TypeError:
+            return _json_dumps(obj).encode("utf-8")
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Deserialize a JSON string or bytes."""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> str:
+        """Serialize an object to a JSON string."""
+        return _json_dumps(obj)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize an object to UTF-8 encoded JSON bytes."""
+        return dumps(obj).encode("utf-8")
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Deserialize a JSON string or bytes."""
+        return json.loads(data)
+
+
+__all__ = ["dumps", "dumps_bytes", "loads", "JSONDecodeError"]
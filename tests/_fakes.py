@@ -0,0 +1,103 @@
+"""Lightweight test doubles shared across the test suite."""
+
+import json
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeConnectionManager:
+    """Plain stand-in for ConnectionManager that records sends.
+
+    Cheaper than AsyncMock(spec=ConnectionManager) and enough for tests that
+    only need to see what the SSE handler tried to deliver.
+    """
+
+    def __init__(self, send_result: bool = True):
+        self.send_result = send_result
+        self.send_to_user_calls: List[Tuple[str, dict]] = []
+        self.connected: List[str] = []
+
+    async def connect(self, user_id: str, websocket) -> None:
+        self.connected.append(user_id)
+
+    async def disconnect(self, user_id: str) -> None:
+        if user_id in self.connected:
+            self.connected.remove(user_id)
+
+    async def send_to_user(self, user_id: str, message: dict) -> bool:
+        self.send_to_user_calls.append((user_id, message))
+        return self.send_result
+
+
+class FakeWebSocket:
+    """Plain stand-in for a WebSocket that records the JSON frames it is sent.
+
+    Unlike AsyncMock it adds no call-recording overhead to the send path, so
+    profiles of the handler show the handler's own cost.
+    """
+
+    __slots__ = ("sent", "fail")
+
+    def __init__(self, fail: bool = False):
+        self.sent: List[dict] = []
+        self.fail = fail
+
+    async def send_text(self, data: str) -> None:
+        if self.fail:
+            raise RuntimeError("Connection error")
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=None, reason=None) -> None:
+        pass
+
+
+class MockWebSocket:
+    """Mock WebSocket for testing purposes."""
+
+    def __init__(self):
+        # Only the most recent messages are ever inspected
+        self.sent_messages = deque(maxlen=16)
+
+    async def send_json(self, message):
+        self.sent_messages.append(message)
+
+    async def send_text(self, data):
+        self.sent_messages.append(json.loads(data))
+
+    async def close(self, code=None, reason=None):
+        pass
+
+
+class FakeBroker:
+    """In-memory stand-in for RedisBroker.
+
+    Workers that share one ``channels`` dict behave like server workers
+    connected to the same Redis: a publish reaches every worker subscribed
+    to the user.
+    """
+
+    def __init__(self, channels: Optional[Dict[str, List["FakeBroker"]]] = None):
+        self.channels = {} if channels is None else channels
+        self.published: List[Tuple[str, str]] = []
+        self._deliver = None
+
+    def start(self, deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(self, user_id: str, payload: str) -> bool:
+        self.published.append((user_id, payload))
+        subscribers = self.channels.get(user_id, [])
+        for broker in subscribers:
+            await broker._deliver(user_id, payload)
+        return bool(subscribers)
+
+    async def subscribe(self, user_id: str) -> None:
+        self.channels.setdefault(user_id, []).append(self)
+
+    async def unsubscribe(self, user_id: str) -> None:
+        subscribers = self.channels.get(user_id, [])
+        if self in subscribers:
+            subscribers.remove(self)
@@ -1,23 +1,43 @@
 """Pytest configuration for WebSocket SSE Server tests."""
 
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from websocket_sse_server.main import app, connection_manager, sse_handler
 
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - uvloop is not available on Windows
+    uvloop = None
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run async tests on uvloop when it is installed, like the server does."""
+    if uvloop is not None:
+        return uvloop.EventLoopPolicy()
+    return asyncio.DefaultEventLoopPolicy()
+
+
+async def _reset_app_state():
+    """Drop connections and request-response state held by the shared app."""
+    await connection_manager.cleanup()
+    for correlation_id in list(sse_handler.request_response_queues):
+        await sse_handler.unregister_request_response(correlation_id)
+    sse_handler.correlation_map.clear()
+
 
 @pytest.fixture(autouse=True)
 async def cleanup():
-    """Clean up before each test."""
-    # Reset connection manager
-    await connection_manager.cleanup()
+    """Clean up before each test, so module-scoped clients share a clean app."""
+    await _reset_app_state()
     yield
-    # Clean up after test
-    await connection_manager.cleanup()
+    await _reset_app_state()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client():
-    """Create a TestClient instance."""
+    """Create a TestClient instance shared by the tests in a module."""
     return TestClient(app)
 
 
@@ -0,0 +1,18 @@
+"""Entry point that runs the app under uvicorn for the live-server tests.
+
+Usage: python -m tests.integration._server_entry --port 8089
+"""
+
+import argparse
+import uvicorn
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+    uvicorn.run("websocket_sse_server.main:app", host="127.0.0.1", port=args.port, log_level="error")
+
+
+if __name__ == "__main__":
+    main()
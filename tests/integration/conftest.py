@@ -0,0 +1,13 @@
+"""Shared fixtures for the integration tests."""
+
+import httpx
+import pytest
+from websocket_sse_server.main import app
+
+
+@pytest.fixture
+async def async_client():
+    """In-process HTTP client that runs the app on the test's own event loop."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
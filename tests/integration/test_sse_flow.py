@@ -1,108 +1,80 @@
 """Integration tests for SSE flow."""
 
-import pytest
-from fastapi.testclient import TestClient
-from websocket_sse_server.main import app, connection_manager, sse_handler
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+from websocket_sse_server.api.sse_endpoints import send_sse_message_with_response
+from websocket_sse_server.main import connection_manager, sse_handler
+from websocket_sse_server.models.message import SSEMessage
+from .._fakes import MockWebSocket
 
 
 class TestSSEFlow:
     """Test SSE integration flow."""
 
-    @pytest.fixture
-    def client(self):
-        """Create a TestClient instance."""
-        return TestClient(app)
-
-    def test_sse_push_single_message(self, client):
+    async def test_sse_push_single_message(self, async_client):
         """Test pushing a single SSE message."""
-        # First, simulate a WebSocket connection
-        import asyncio
-        
-        async def test_logic():
-            # Clear any existing connections
-            await connection_manager.cleanup()
-            
-            # Connect a mock user
-            mock_ws = MockWebSocket()
-            await connection_manager.connect("test123", mock_ws)
-            
-            # Push SSE message via the API
-            response = client.post(
-                "/sse/push",
-                json={
-                    "user_id": "test123",
-                    "data": {"text": "Hello from SSE"}
-                }
-            )
-
-            assert response.status_code == 200
-            result = response.json()
-            assert result["status"] == "success"
-            
-            # Clean up
-            await connection_manager.disconnect("test123")
-        
-        asyncio.run(test_logic())
-
-    def test_sse_push_message_to_disconnected_user(self, client):
+        # Connect a mock user
+        mock_ws = MockWebSocket()
+        await connection_manager.connect("test123", mock_ws)
+
+        # Push SSE message via the API
+        response = await async_client.post(
+            "/sse/push",
+            json={
+                "user_id": "test123",
+                "data": {"text": "Hello from SSE"}
+            }
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["status"] == "success"
+        assert mock_ws.sent_messages[-1]["text"] == "Hello from SSE"
+
+    async def test_sse_push_message_to_disconnected_user(self, async_client):
         """Test pushing message to non-existent user."""
-        # Clear any existing connections
-        import asyncio
-        
-        async def test_logic():
-            await connection_manager.cleanup()
-            
-            response = client.post(
-                "/sse/push",
-                json={
-                    "user_id": "nonexistent",
-                    "data": {"text": "Hello"}
-                }
-            )
-
-            assert response.status_code == 200
-            result = response.json()
-            assert result["status"] == "partial"  # Changed from "failed" to "partial" based on expected behavior
-        
-        asyncio.run(test_logic())
-
-    def test_sse_push_batch_messages(self, client):
+        response = await async_client.post(
+            "/sse/push",
+            json={
+                "user_id": "nonexistent",
+                "data": {"text": "Hello"}
+            }
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["status"] == "partial"  # Changed from "failed" to "partial" based on expected behavior
+
+    async def test_sse_push_batch_messages(self, async_client):
         """Test pushing multiple SSE messages."""
-        # Clear any existing connections
-        import asyncio
-        
-        async def test_logic():
-            await connection_manager.cleanup()
-            
-            # Connect two mock users
-            mock_ws1 = MockWebSocket()
-            mock_ws2 = MockWebSocket()
-            await connection_manager.connect("user1", mock_ws1)
-            await connection_manager.connect("user2", mock_ws2)
-            
-            response = client.post(
-                "/sse/push/batch",
-                json=[
-                    {"user_id": "user1", "data": {"msg": "msg1"}},
-                    {"user_id": "user2", "data": {"msg": "msg2"}},
-                    {"user_id": "user3", "data": {"msg": "msg3"}},
-                ]
-            )
-
-            assert response.status_code == 200
-            result = response.json()
-            assert len(result["results"]) == 3
-            # Check that first two succeeded and third failed
-            results_by_user = {r["user_id"]: r for r in result["results"]}
-            assert results_by_user["user1"]["success"] is True
-            assert results_by_user["user2"]["success"] is True
-            assert results_by_user["user3"]["success"] is False  # user3 not connected
-            
-            # Clean up
-            await connection_manager.disconnect("user1")
-            await connection_manager.disconnect("user2")
-        
-        asyncio.run(test_logic())
+        # Connect two mock users
+        mock_ws1 = MockWebSocket()
+        mock_ws2 = MockWebSocket()
+        await asyncio.gather(
+            connection_manager.connect("user1", mock_ws1),
+            connection_manager.connect("user2", mock_ws2),
+        )
+
+        response = await async_client.post(
+            "/sse/push/batch",
+            json=[
+                {"user_id": "user1", "data": {"msg": "msg1"}},
+                {"user_id": "user2", "data": {"msg": "msg2"}},
+                {"user_id": "user3", "data": {"msg": "msg3"}},
+            ]
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert len(result["results"]) == 3
+        # Check that first two succeeded and third failed
+        results_by_user = {r["user_id"]: r for r in result["results"]}
+        assert results_by_user["user1"]["success"] is True
+        assert results_by_user["user2"]["success"] is True
+        assert results_by_user["user3"]["success"] is False  # user3 not connected
+        assert mock_ws1.sent_messages[-1]["msg"] == "msg1"
+        assert mock_ws2.sent_messages[-1]["msg"] == "msg2"
 
     def test_sse_push_invalid_message(self, client):
         """Test pushing invalid SSE message."""
@@ -114,6 +86,23 @@ class TestSSEFlow:
         # This should return a validation error (422)
         assert response.status_code == 422  # Validation error
 
+    def test_sse_send_to_disconnected_user(self, client):
+        """Test /sse/send streams an error frame when the user is not connected."""
+        response = client.post(
+            "/sse/send",
+            json={
+                "user_id": "nonexistent",
+                "data": {"text": "Hello", "correlation_id": "corr-\"quoted\""}
+            }
+        )
+
+        assert response.status_code == 200
+        assert response.text.startswith("data: ")
+        assert json.loads(response.text[len("data: "):]) == {
+            "error": "User not connected",
+            "correlation_id": 'corr-"quoted"'
+        }
+
     def test_health_endpoint(self, client):
         """Test health check endpoint."""
         response = client.get("/health")
@@ -132,15 +121,22 @@ class TestSSEFlow:
         assert "active_connections" in result
         assert result["service"] == "websocket-sse-server"
 
-
-class MockWebSocket:
-    """Mock WebSocket for testing purposes."""
-    
-    def __init__(self):
-        self.sent_messages = []
-    
-    async def send_json(self, message):
-        self.sent_messages.append(message)
-    
-    async def close(self, code=None, reason=None):
-        pass
\ No newline at end of file
+    async def test_sse_send_coalesces_queued_responses(self, monkeypatch):
+        """Test responses already queued for a flow go out in a single write."""
+        async def deliver_burst(message):
+            correlation_id = message.data["correlation_id"]
+            for n in range(5):
+                await sse_handler.send_to_request_response(correlation_id, {"n": n, "is_final": n == 4})
+            return True
+
+        monkeypatch.setattr(sse_handler, "process_sse_message", deliver_burst)
+        request = MagicMock()
+        request.is_disconnected = AsyncMock(return_value=False)
+        message = SSEMessage(user_id="user1", data={"correlation_id": "burst"})
+
+        response = await send_sse_message_with_response(message, request, sse_handler)
+        chunks = [chunk async for chunk in response.body_iterator]
+
+        assert len(chunks) == 1
+        frames = chunks[0].split(b"\n\n")[:-1]
+        assert [json.loads(frame.removeprefix(b"data: "))["n"] for frame in frames] == [0, 1, 2, 3, 4]
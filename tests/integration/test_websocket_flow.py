@@ -1,99 +1,59 @@
 """Integration tests for WebSocket flow."""
 
+import asyncio
+import json
 import threading
 import time
 import pytest
-from fastapi.testclient import TestClient
-from websocket_sse_server.main import app, connection_manager
-import asyncio
-import json
+from unittest.mock import AsyncMock, patch
+from starlette.websockets import WebSocketDisconnect
+from websocket_sse_server.main import connection_manager, sse_handler
+from websocket_sse_server.utils.exceptions import DuplicateConnectionError
+from .._fakes import MockWebSocket
 
 
 class TestWebSocketFlow:
     """Test WebSocket integration flow."""
 
-    @pytest.fixture
-    def client(self):
-        """Create a TestClient instance."""
-        return TestClient(app)
-
-    def test_websocket_connect_and_disconnect(self):
+    async def test_websocket_connect_and_disconnect(self):
         """Test WebSocket connection and disconnection."""
         # Using TestClient for HTTP endpoints, but not for WebSocket
         # For WebSocket testing, we'll test the connection manager directly
-        import asyncio
-
-        async def test_logic():
-            # Clear any existing connections
-            await connection_manager.cleanup()
+        # Simulate a WebSocket connection
+        mock_ws = MockWebSocket()
+        await connection_manager.connect("test123", mock_ws)
 
-            # Simulate a WebSocket connection
-            mock_ws = MockWebSocket()
-            await connection_manager.connect("test123", mock_ws)
+        # Verify connection is established
+        assert connection_manager.get_connection_count() == 1
 
-            # Verify connection is established
-            assert connection_manager.get_connection_count() == 1
+        # Send a message
+        await connection_manager.send_to_user("test123", {"message": "ping"})
 
-            # Send a message
-            await connection_manager.send_to_user("test123", {"message": "ping"})
+        # Disconnect
+        await connection_manager.disconnect("test123")
 
-            # Disconnect
-            await connection_manager.disconnect("test123")
+        # Verify disconnection
+        assert connection_manager.get_connection_count() == 0
 
-            # Verify disconnection
-            assert connection_manager.get_connection_count() == 0
-
-        asyncio.run(test_logic())
-
-    def test_websocket_duplicate_connection(self):
+    async def test_websocket_duplicate_connection(self):
         """Test duplicate connection is rejected."""
-        import asyncio
-
-        async def test_logic():
-            # Clear any existing connections
-            await connection_manager.cleanup()
-
-            # Connect first user
-            mock_ws1 = MockWebSocket()
-            await connection_manager.connect("test123", mock_ws1)
-
-            # Try to connect duplicate user - should raise exception
-            mock_ws2 = MockWebSocket()
-            from websocket_sse_server.utils.exceptions import DuplicateConnectionError
-            with pytest.raises(DuplicateConnectionError):
-                await connection_manager.connect("test123", mock_ws2)
+        # Connect first user
+        mock_ws1 = MockWebSocket()
+        await connection_manager.connect("test123", mock_ws1)
 
-            # Clean up
-            await connection_manager.disconnect("test123")
+        # Try to connect duplicate user - should raise exception
+        mock_ws2 = MockWebSocket()
+        with pytest.raises(DuplicateConnectionError):
+            await connection_manager.connect("test123", mock_ws2)
 
-        asyncio.run(test_logic())
-
-    def test_websocket_multiple_connections(self):
+    async def test_websocket_multiple_connections(self):
         """Test multiple different user connections."""
-        import asyncio
-
-        async def test_logic():
-            # Clear any existing connections
-            await connection_manager.cleanup()
-
-            # Connect multiple users
-            mock_ws1 = MockWebSocket()
-            mock_ws2 = MockWebSocket()
-            mock_ws3 = MockWebSocket()
-
-            await connection_manager.connect("user1", mock_ws1)
-            await connection_manager.connect("user2", mock_ws2)
-            await connection_manager.connect("user3", mock_ws3)
-
-            # Verify all connections are established
-            assert connection_manager.get_connection_count() == 3
+        # Connect multiple users
+        user_ids = ("user1", "user2", "user3")
+        await asyncio.gather(*(connection_manager.connect(uid, MockWebSocket()) for uid in user_ids))
 
-            # Clean up
-            await connection_manager.disconnect("user1")
-            await connection_manager.disconnect("user2")
-            await connection_manager.disconnect("user3")
-
-        asyncio.run(test_logic())
+        # Verify all connections are established
+        assert connection_manager.get_connection_count() == 3
 
     def test_websocket_missing_user_id(self, client):
         """Test connection without user_id parameter."""
@@ -103,15 +63,50 @@ class TestWebSocketFlow:
         response = client.get("/docs")  # Just a simple test to make sure the app works
         assert response.status_code == 200
 
-
-class MockWebSocket:
-    """Mock WebSocket for testing purposes."""
-
-    def __init__(self):
-        self.sent_messages = []
-
-    async def send_json(self, message):
-        self.sent_messages.append(message)
-
-    async def close(self, code=None, reason=None):
-        pass
+    def test_websocket_final_response_forwarded_once(self, client):
+        """Test a final_response frame is forwarded a single time, marked final."""
+        with patch.object(sse_handler, "forward_websocket_response_to_sse",
+                          new_callable=AsyncMock) as mock_forward:
+            with client.websocket_connect("/ws?user_id=final_user") as websocket:
+                websocket.send_text(json.dumps({"type": "final_response", "correlation_id": "c1"}))
+                websocket.send_text(json.dumps({"type": "ping"}))
+                # Close the socket from the client so the handler loop finishes
+            deadline = time.time() + 2
+            while mock_forward.await_count < 2 and time.time() < deadline:
+                time.sleep(0.01)
+
+        assert mock_forward.await_count == 2
+        assert mock_forward.await_args_list[0].args == (
+            "final_user", {"type": "final_response", "correlation_id": "c1", "is_final": True}
+        )
+
+    def test_websocket_rejected_duplicate_keeps_first_connection(self, client):
+        """Test a rejected duplicate connect leaves the user's live connection registered."""
+        with patch.object(sse_handler, "user_disconnected", new_callable=AsyncMock) as mock_unsubscribe:
+            with client.websocket_connect("/ws?user_id=dup_user"):
+                with client.websocket_connect("/ws?user_id=dup_user") as duplicate:
+                    with pytest.raises(WebSocketDisconnect) as exc_info:
+                        duplicate.receive_text()
+                assert exc_info.value.code == 1008
+                # Give the rejected endpoint time to run its cleanup
+                time.sleep(0.05)
+                assert "dup_user" in connection_manager.connections
+                mock_unsubscribe.assert_not_awaited()
+
+    def test_websocket_binary_and_plain_text_frames(self, client):
+        """Test binary JSON frames are parsed and plain text is wrapped as a response."""
+        with patch.object(sse_handler, "forward_websocket_response_to_sse",
+                          new_callable=AsyncMock) as mock_forward:
+            with client.websocket_connect("/ws?user_id=frame_user") as websocket:
+                websocket.send_bytes(json.dumps({"type": "response", "correlation_id": "c2"}).encode())
+                websocket.send_text("plain text")
+            deadline = time.time() + 2
+            while mock_forward.await_count < 2 and time.time() < deadline:
+                time.sleep(0.01)
+
+        assert mock_forward.await_args_list[0].args == (
+            "frame_user", {"type": "response", "correlation_id": "c2"}
+        )
+        plain = mock_forward.await_args_list[1].args[1]
+        assert plain["message"] == "plain text"
+        assert plain["type"] == "response"
@@ -13,11 +13,12 @@ from src.websocket_sse_server.main import app
 from src.websocket_sse_server.core.sse_handler import SSEHandler
 from src.websocket_sse_server.core.connection_manager import ConnectionManager
 from src.websocket_sse_server.models.message import SSEMessage
+from ._fakes import FakeConnectionManager
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def test_client():
-    """Create a test client for the FastAPI app."""
+    """Create a test client for the FastAPI app, shared by the module's tests."""
     return TestClient(app)
 
 
@@ -35,6 +36,12 @@ def sse_handler(mock_connection_manager):
     return SSEHandler(mock_connection_manager)
 
 
+@pytest.fixture
+def response_handler():
+    """Create an SSEHandler for request-response tests, which never touch the connection manager."""
+    return SSEHandler(connection_manager=None)
+
+
 class TestSSEHandler:
     """Test cases for SSEHandler class."""
 
@@ -73,81 +80,65 @@ class TestSSEHandler:
         assert result is True
 
     @pytest.mark.asyncio
-    async def test_register_and_unregister_request_response(self, sse_handler):
+    async def test_process_sse_message_passes_data_by_reference(self, sse_handler):
+        """Test a validated message's data is routed in place, without a copy."""
+        message = SSEMessage(user_id="test_user_123", data={"message": "Hello from SSE"})
+
+        assert await sse_handler.process_sse_message(message) is True
+
+        send_to_user = sse_handler.connection_manager.send_to_user
+        assert send_to_user.call_count == 1
+        assert send_to_user.call_args.args[1] is message.data
+
+    @pytest.mark.asyncio
+    async def test_register_and_unregister_request_response(self, response_handler):
         """Test registering and unregistering request-response flows."""
         correlation_id = "test_corr_123"
         
         # Register a request-response flow
-        queue = await sse_handler.register_request_response(correlation_id)
-        assert correlation_id in sse_handler.request_response_queues
-        assert sse_handler.request_response_queues[correlation_id] == queue
+        queue = await response_handler.register_request_response(correlation_id)
+        assert correlation_id in response_handler.request_response_queues
+        assert response_handler.request_response_queues[correlation_id] == queue
         
         # Unregister the flow
-        await sse_handler.unregister_request_response(correlation_id)
-        assert correlation_id not in sse_handler.request_response_queues
+        await response_handler.unregister_request_response(correlation_id)
+        assert correlation_id not in response_handler.request_response_queues
 
     @pytest.mark.asyncio
-    async def test_send_to_request_response(self, sse_handler):
-        """Test sending a response to a request-response flow."""
-        correlation_id = "test_corr_123"
-        
+    @pytest.mark.parametrize("deliver, correlation_id, expected", [
+        pytest.param(
+            lambda handler, response: handler.send_to_request_response("test_corr_123", response),
+            "test_corr_123", True, id="send_to_request_response"),
+        pytest.param(
+            lambda handler, response: handler.forward_websocket_response_to_sse("some_user", response),
+            "test_corr_123", True, id="forward_with_matching_corr_id"),
+        pytest.param(
+            lambda handler, response: handler.forward_websocket_response_to_sse("some_user", response),
+            "nonexistent_corr_id", False, id="forward_without_matching_corr_id"),
+    ])
+    async def test_response_delivery(self, response_handler, deliver, correlation_id, expected):
+        """Test responses reach a registered request-response flow, and only that flow."""
         # Register a request-response flow
-        queue = await sse_handler.register_request_response(correlation_id)
-        
-        # Send a response
-        response_data = {"result": "success", "correlation_id": correlation_id}
-        success = await sse_handler.send_to_request_response(correlation_id, response_data)
-        
-        assert success is True
-        
-        # Verify the response was put in the queue
-        response_from_queue = await queue.get()
-        assert json.loads(response_from_queue) == response_data
-        
-        # Clean up
-        await sse_handler.unregister_request_response(correlation_id)
+        queue = await response_handler.register_request_response("test_corr_123")
 
-    @pytest.mark.asyncio
-    async def test_forward_websocket_response_to_sse_with_matching_corr_id(self, sse_handler):
-        """Test forwarding WebSocket response to SSE when correlation ID matches."""
-        correlation_id = "test_corr_123"
-        
-        # Register a request-response flow
-        queue = await sse_handler.register_request_response(correlation_id)
-        
-        # Prepare response data with matching correlation ID
         response_data = {
             "type": "response",
             "data": {"reply": "Hello from WebSocket"},
             "correlation_id": correlation_id
         }
-        
-        # Forward the response
-        success = await sse_handler.forward_websocket_response_to_sse("some_user", response_data)
-        
-        assert success is True
-        
-        # Verify the response was put in the correct queue
-        response_from_queue = await queue.get()
-        assert json.loads(response_from_queue) == response_data
-        
-        # Clean up
-        await sse_handler.unregister_request_response(correlation_id)
 
-    @pytest.mark.asyncio
-    async def test_forward_websocket_response_to_sse_without_matching_corr_id(self, sse_handler):
-        """Test forwarding WebSocket response to SSE when no matching correlation ID."""
-        response_data = {
-            "type": "response",
-            "data": {"reply": "Hello from WebSocket"},
-            "correlation_id": "nonexistent_corr_id"
-        }
-        
-        # Forward the response
-        success = await sse_handler.forward_websocket_response_to_sse("some_user", response_data)
-        
-        # Should return False since no matching request-response flow exists
-        assert success is False
+        success = await deliver(response_handler, response_data)
+        assert success is expected
+
+        if expected:
+            # Verify the response was put in the correct queue
+            response_from_queue = await queue.get()
+            assert json.loads(response_from_queue) == response_data
+        else:
+            assert queue.empty()
+
+        # Clean up
+        await response_handler.unregister_request_response("test_corr_123")
 
 
 class TestSSEEndpoints:
@@ -251,11 +242,8 @@ class TestWebSocketEndpoint:
     @pytest.mark.asyncio
     async def test_websocket_integration_with_sse_flow(self):
         """Test the integration between WebSocket and SSE for bidirectional communication."""
-        # Create a mock connection manager
-        mock_conn_manager = AsyncMock(spec=ConnectionManager)
-        mock_conn_manager.connect = AsyncMock()
-        mock_conn_manager.disconnect = AsyncMock()
-        mock_conn_manager.send_to_user = AsyncMock(return_value=True)
+        # Create a fake connection manager
+        mock_conn_manager = FakeConnectionManager()
 
         # Create an SSE handler
         sse_handler = SSEHandler(mock_conn_manager)
@@ -275,9 +263,8 @@ class TestWebSocketEndpoint:
         assert result is True  # Should succeed since we mocked send_to_user
 
         # Verify that send_to_user was called with the correct data
-        mock_conn_manager.send_to_user.assert_called_once()
-        call_args = mock_conn_manager.send_to_user.call_args
-        user_id, message_data = call_args[0]
+        assert len(mock_conn_manager.send_to_user_calls) == 1
+        user_id, message_data = mock_conn_manager.send_to_user_calls[0]
 
         # Verify user_id was added to the message data
         assert user_id == "test_user_123"
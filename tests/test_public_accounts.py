@@ -2,26 +2,49 @@
 
 import pytest
 import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock
 from src.websocket_sse_server.core.connection_manager import ConnectionManager
 from src.websocket_sse_server.core.sse_handler import SSEHandler
-from src.websocket_sse_server.config import add_public_account, is_public_account
+from src.websocket_sse_server import config
+from src.websocket_sse_server.config import add_public_account, get_public_accounts, is_public_account
+
+
+@pytest.fixture(scope="module")
+def shared_manager():
+    """Create one ConnectionManager for the module."""
+    return ConnectionManager()
+
+
+@pytest.fixture
+async def connection_manager(shared_manager):
+    """Provide the shared ConnectionManager, reset after each test."""
+    yield shared_manager
+    await shared_manager.cleanup()
+
+
+@pytest.fixture
+def sse_handler(connection_manager):
+    """Create an SSEHandler on the shared ConnectionManager."""
+    return SSEHandler(connection_manager)
+
+
+@pytest.fixture(autouse=True)
+def reset_public_accounts(monkeypatch):
+    """Forget accounts added at runtime so each test starts from the defaults."""
+    monkeypatch.setattr(config, "_DYNAMIC_PUBLIC_ACCOUNTS", set())
 
 
 @pytest.mark.asyncio
-async def test_public_account_mention_routing():
+async def test_public_account_mention_routing(connection_manager, sse_handler):
     """Test that messages with @public_account are routed correctly."""
-    # Setup
-    connection_manager = ConnectionManager()
-    sse_handler = SSEHandler(connection_manager)
-    
     # Mock WebSocket connection for the public account
     mock_ws_public = AsyncMock()
-    mock_ws_public.send_json = AsyncMock(return_value=None)
+    mock_ws_public.send_text = AsyncMock(return_value=None)
     
     # Mock WebSocket connection for original sender
     mock_ws_original = AsyncMock()
-    mock_ws_original.send_json = AsyncMock(return_value=None)
+    mock_ws_original.send_text = AsyncMock(return_value=None)
     
     # Add public account to the system
     add_public_account("ci_bot")
@@ -42,11 +65,11 @@ async def test_public_account_mention_routing():
     result = await sse_handler.process_sse_message(message_with_mention)
     
     # Verify that the message was sent to the public account (ci_bot), not the original user
-    mock_ws_public.send_json.assert_called_once()
+    mock_ws_public.send_text.assert_called_once()
     
-    # Get the arguments passed to send_json
-    args, kwargs = mock_ws_public.send_json.call_args
-    sent_data = args[0]
+    # Get the JSON text passed to send_text
+    args, kwargs = mock_ws_public.send_text.call_args
+    sent_data = json.loads(args[0])
     
     # Verify that original sender info is preserved
     assert "original_sender" in sent_data
@@ -57,15 +80,11 @@ async def test_public_account_mention_routing():
 
 
 @pytest.mark.asyncio
-async def test_normal_message_routing():
+async def test_normal_message_routing(connection_manager, sse_handler):
     """Test that normal messages without @mention are routed normally."""
-    # Setup
-    connection_manager = ConnectionManager()
-    sse_handler = SSEHandler(connection_manager)
-    
     # Mock WebSocket connection for the original user
     mock_ws_original = AsyncMock()
-    mock_ws_original.send_json = AsyncMock(return_value=None)
+    mock_ws_original.send_text = AsyncMock(return_value=None)
     
     # Connect original user to WebSocket
     await connection_manager.connect("user123", mock_ws_original)
@@ -83,11 +102,11 @@ async def test_normal_message_routing():
     result = await sse_handler.process_sse_message(normal_message)
     
     # Verify that the message was sent to the original user
-    mock_ws_original.send_json.assert_called_once()
+    mock_ws_original.send_text.assert_called_once()
     
-    # Get the arguments passed to send_json
-    args, kwargs = mock_ws_original.send_json.call_args
-    sent_data = args[0]
+    # Get the JSON text passed to send_text
+    args, kwargs = mock_ws_original.send_text.call_args
+    sent_data = json.loads(args[0])
     
     # Verify that original sender info is still preserved even for normal messages
     assert "original_sender" in sent_data
@@ -98,22 +117,18 @@ async def test_normal_message_routing():
 
 
 @pytest.mark.asyncio
-async def test_multiple_mentions():
+async def test_multiple_mentions(connection_manager, sse_handler):
     """Test message with multiple @mentions - should route to first matching public account."""
-    # Setup
-    connection_manager = ConnectionManager()
-    sse_handler = SSEHandler(connection_manager)
-    
     # Add public accounts
     add_public_account("ci_bot")
     add_public_account("notification_bot")
     
     # Mock WebSocket connections
     mock_ws_ci = AsyncMock()
-    mock_ws_ci.send_json = AsyncMock(return_value=None)
+    mock_ws_ci.send_text = AsyncMock(return_value=None)
     
     mock_ws_notification = AsyncMock()
-    mock_ws_notification.send_json = AsyncMock(return_value=None)
+    mock_ws_notification.send_text = AsyncMock(return_value=None)
     
     # Connect public accounts
     await connection_manager.connect("ci_bot", mock_ws_ci)
@@ -133,19 +148,31 @@ async def test_multiple_mentions():
     
     # Should route to the first matching public account found (notification_bot in this case)
     # Since both might be called depending on implementation, we check that at least one was called
-    assert mock_ws_ci.send_json.called or mock_ws_notification.send_json.called
+    assert mock_ws_ci.send_text.called or mock_ws_notification.send_text.called
     
     # Verify that original sender info is preserved
-    if mock_ws_notification.send_json.called:
-        args, kwargs = mock_ws_notification.send_json.call_args
-        sent_data = args[0]
+    if mock_ws_notification.send_text.called:
+        args, kwargs = mock_ws_notification.send_text.call_args
+        sent_data = json.loads(args[0])
         assert "original_sender" in sent_data
         assert sent_data["original_sender"]["user_id"] == "user123"
-    elif mock_ws_ci.send_json.called:
-        args, kwargs = mock_ws_ci.send_json.call_args
-        sent_data = args[0]
+    elif mock_ws_ci.send_text.called:
+        args, kwargs = mock_ws_ci.send_text.call_args
+        sent_data = json.loads(args[0])
         assert "original_sender" in sent_data
         assert sent_data["original_sender"]["user_id"] == "user123"
     
     # Verify that the message was delivered successfully
-    assert result is True
\ No newline at end of file
+    assert result is True
+
+
+def test_add_public_account_at_runtime():
+    """Test that accounts added at runtime are recognised alongside the defaults."""
+    assert is_public_account("ci_bot")
+    assert not is_public_account("runtime_bot")
+
+    add_public_account("runtime_bot")
+
+    assert is_public_account("runtime_bot")
+    assert "runtime_bot" in get_public_accounts()
+    assert "ci_bot" in get_public_accounts()
@@ -0,0 +1,186 @@
+"""Tests for the Redis pub/sub broker against an in-memory redis.asyncio stand-in."""
+
+import asyncio
+from typing import List, Optional, Tuple
+from unittest.mock import AsyncMock
+import pytest
+from websocket_sse_server.core import broker as broker_module
+from websocket_sse_server.core.broker import RedisBroker
+
+
+class FakePubSub:
+    """Hands out queued messages, or raises queued errors, from get_message."""
+
+    def __init__(self):
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.subscribe = AsyncMock()
+        self.unsubscribe = AsyncMock()
+        self.aclose = AsyncMock()
+
+    async def get_message(self, timeout: Optional[float] = None):
+        item = await self.messages.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class FakeRedis:
+    """Reports a fixed number of receivers for every publish."""
+
+    def __init__(self, receivers: int = 1):
+        self.pubsub_client = FakePubSub()
+        self.publish = AsyncMock(return_value=receivers)
+        self.aclose = AsyncMock()
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return self.pubsub_client
+
+
+class FakeAioredis:
+    """Stands in for the redis.asyncio module."""
+
+    def __init__(self):
+        self.client = FakeRedis()
+
+    def from_url(self, url: str, decode_responses: bool = False) -> FakeRedis:
+        return self.client
+
+
+class TestRedisBroker:
+    """Test cases for RedisBroker."""
+
+    @pytest.fixture
+    def aioredis(self, monkeypatch):
+        """Replace redis.asyncio with an in-memory stand-in."""
+        fake = FakeAioredis()
+        monkeypatch.setattr(broker_module, "aioredis", fake)
+        return fake
+
+    @pytest.fixture
+    async def relay(self, aioredis):
+        """Start a broker relaying into a list of (user_id, payload) deliveries."""
+        broker = RedisBroker("redis://localhost", channel_prefix="app:user:")
+        delivered: List[Tuple[str, str]] = []
+
+        async def deliver(user_id: str, payload: str) -> bool:
+            delivered.append((user_id, payload))
+            return True
+
+        broker.start(deliver)
+        yield broker, aioredis.client.pubsub_client, delivered
+        await broker.stop()
+
+    @staticmethod
+    def _published(channel: str, data: str) -> dict:
+        return {"type": "message", "channel": channel, "data": data}
+
+    @pytest.mark.asyncio
+    async def test_requires_redis_package(self, monkeypatch):
+        """Test constructing the broker without redis installed fails clearly."""
+        monkeypatch.setattr(broker_module, "aioredis", None)
+        with pytest.raises(RuntimeError, match="redis"):
+            RedisBroker("redis://localhost")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("receivers, expected", [(0, False), (1, True), (3, True)])
+    async def test_publish_reports_receivers(self, aioredis, receivers, expected):
+        """Test publishing succeeds only if a worker was subscribed."""
+        aioredis.client.publish.return_value = receivers
+        broker = RedisBroker("redis://localhost", channel_prefix="app:user:")
+
+        assert await broker.publish("user1", '{"n": 1}') is expected
+        aioredis.client.publish.assert_awaited_once_with("app:user:user1", '{"n": 1}')
+
+    @pytest.mark.asyncio
+    async def test_relays_message_to_user_from_channel(self, relay):
+        """Test the channel prefix is stripped to find the user to deliver to."""
+        broker, pubsub, delivered = relay
+        await broker.subscribe("user:1")
+        pubsub.subscribe.assert_awaited_once_with("app:user:user:1")
+
+        await pubsub.messages.put({"type": "pmessage", "channel": "app:user:user:1", "data": "skipped"})
+        await pubsub.messages.put(self._published("app:user:user:1", '{"n": 1}'))
+        await asyncio.sleep(0.01)
+
+        assert delivered == [("user:1", '{"n": 1}')]
+
+    @pytest.mark.asyncio
+    async def test_listener_waits_for_first_subscribe(self, relay):
+        """Test nothing is read from pub/sub before a user is subscribed."""
+        broker, pubsub, delivered = relay
+        await pubsub.messages.put(self._published("app:user:user1", "early"))
+        await asyncio.sleep(0.01)
+        assert delivered == []
+        assert pubsub.messages.qsize() == 1
+
+        await broker.subscribe("user1")
+        await asyncio.sleep(0.01)
+        assert delivered == [("user1", "early")]
+
+    @pytest.mark.asyncio
+    async def test_listener_retries_after_connection_error(self, relay, monkeypatch):
+        """Test a failed read is retried instead of ending the relay."""
+        monkeypatch.setattr(broker_module, "LISTEN_RETRY_INITIAL_SECONDS", 0)
+        broker, pubsub, delivered = relay
+        await broker.subscribe("user1")
+
+        await pubsub.messages.put(ConnectionError("connection reset"))
+        await pubsub.messages.put(self._published("app:user:user1", "after"))
+        await asyncio.sleep(0.01)
+
+        assert delivered == [("user1", "after")]
+
+    @pytest.mark.asyncio
+    async def test_listener_skips_malformed_message(self, relay):
+        """Test a malformed message is dropped without ending the relay."""
+        broker, pubsub, delivered = relay
+        await broker.subscribe("user1")
+
+        await pubsub.messages.put({"type": "message"})
+        await pubsub.messages.put(self._published("app:user:user1", "after"))
+        await asyncio.sleep(0.01)
+
+        assert broker._listener is not None and not broker._listener.done()
+        assert delivered == [("user1", "after")]
+
+    @pytest.mark.asyncio
+    async def test_stuck_delivery_does_not_block_other_users(self, aioredis):
+        """Test one client stuck on a send does not hold up the relay for others."""
+        broker = RedisBroker("redis://localhost")
+        stuck = asyncio.Event()
+        delivered: List[str] = []
+
+        async def deliver(user_id: str, payload: str) -> bool:
+            if user_id == "slow":
+                await stuck.wait()
+            delivered.append(user_id)
+            return True
+
+        broker.start(deliver)
+        await broker.subscribe("slow")
+        pubsub = aioredis.client.pubsub_client
+        await pubsub.messages.put(self._published("user:slow", "1"))
+        await pubsub.messages.put(self._published("user:fast", "2"))
+        await asyncio.sleep(0.01)
+        assert delivered == ["fast"]
+
+        # Stopping abandons the stuck delivery
+        await broker.stop()
+        assert not broker._deliveries
+
+    @pytest.mark.asyncio
+    async def test_stop_closes_connections_after_failed_listener(self, aioredis):
+        """Test a listener that died does not keep stop() from closing the connections."""
+        broker = RedisBroker("redis://localhost")
+
+        async def failed_listener():
+            raise RuntimeError("relay crashed")
+
+        broker._listener = asyncio.create_task(failed_listener())
+        await asyncio.sleep(0)
+        assert broker._listener.done()
+
+        await broker.stop()
+
+        aioredis.client.pubsub_client.aclose.assert_awaited_once()
+        aioredis.client.aclose.assert_awaited_once()
@@ -1,19 +1,28 @@
 """Unit tests for ConnectionManager."""
 
+import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock
+from websocket_sse_server.core import connection_manager as connection_manager_module
 from websocket_sse_server.core.connection_manager import ConnectionManager
-from websocket_sse_server.utils.exceptions import DuplicateConnectionError
+from websocket_sse_server.utils.exceptions import ConnectionLimitError, DuplicateConnectionError
 
 
 class TestConnectionManager:
     """Test ConnectionManager functionality."""
 
-    @pytest.fixture
-    def manager(self):
-        """Create a ConnectionManager instance for testing."""
+    @pytest.fixture(scope="class")
+    def shared_manager(self):
+        """Create one ConnectionManager for the whole class."""
         return ConnectionManager()
 
+    @pytest.fixture
+    async def manager(self, shared_manager):
+        """Provide the shared ConnectionManager, reset after each test."""
+        yield shared_manager
+        await shared_manager.cleanup()
+
     def test_initial_state(self):
         """Test initial state of ConnectionManager."""
         manager = ConnectionManager()
@@ -38,6 +47,52 @@ class TestConnectionManager:
             await manager.connect("user1", mock_websocket)
         assert exc_info.value.user_id == "user1"
 
+    @pytest.mark.asyncio
+    async def test_concurrent_connects_admit_one(self, manager):
+        """Test only one of many concurrent connects for a user succeeds."""
+        websockets = [AsyncMock() for _ in range(1000)]
+        results = await asyncio.gather(
+            *(manager.connect("user1", ws) for ws in websockets),
+            return_exceptions=True
+        )
+
+        assert sum(1 for result in results if result is None) == 1
+        assert all(isinstance(result, DuplicateConnectionError) for result in results if result is not None)
+        assert manager.connections["user1"] is websockets[results.index(None)]
+
+    @pytest.mark.asyncio
+    async def test_connection_limit_waits_for_free_slot(self):
+        """Test connects beyond the limit wait for a slot instead of failing."""
+        manager = ConnectionManager(max_connections=1)
+        await manager.connect("user1", AsyncMock())
+
+        waiting = asyncio.create_task(manager.connect("user2", AsyncMock()))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        await manager.disconnect("user1")
+        await waiting
+        assert list(manager.connections) == ["user2"]
+
+        # Raising the limit admits waiting connects right away
+        waiting = asyncio.create_task(manager.connect("user3", AsyncMock()))
+        await asyncio.sleep(0)
+        manager.set_max_connections(2)
+        await waiting
+        assert manager.get_connection_count() == 2
+        await manager.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_connection_limit_times_out(self):
+        """Test a connect that never gets a slot raises ConnectionLimitError."""
+        manager = ConnectionManager(max_connections=1, connect_wait_timeout=0.01)
+        await manager.connect("user1", AsyncMock())
+
+        with pytest.raises(ConnectionLimitError):
+            await manager.connect("user2", AsyncMock())
+        assert not manager._slot_waiters or all(w.done() for w in manager._slot_waiters)
+        await manager.cleanup()
+
     @pytest.mark.asyncio
     async def test_disconnect(self, manager):
         """Test disconnecting a user."""
@@ -58,7 +113,7 @@ class TestConnectionManager:
         result = await manager.send_to_user("user1", message)
 
         assert result is True
-        mock_websocket.send_json.assert_called_once_with(message)
+        mock_websocket.send_text.assert_called_once_with(json.dumps(message, separators=(",", ":")))
 
     @pytest.mark.asyncio
     async def test_send_to_user_not_connected(self, manager):
@@ -71,7 +126,7 @@ class TestConnectionManager:
     async def test_send_to_user_error(self, manager):
         """Test sending message when connection fails."""
         mock_websocket = AsyncMock()
-        mock_websocket.send_json.side_effect = Exception("Connection error")
+        mock_websocket.send_text.side_effect = Exception("Connection error")
         await manager.connect("user1", mock_websocket)
 
         message = {"text": "Hello"}
@@ -94,15 +149,52 @@ class TestConnectionManager:
         sent_count = await manager.broadcast(message)
 
         assert sent_count == 2
-        mock_websocket1.send_json.assert_called_once_with(message)
-        mock_websocket2.send_json.assert_called_once_with(message)
+        assert mock_websocket1.send_text.call_count == mock_websocket2.send_text.call_count == 1
+        sent = mock_websocket1.send_text.call_args.args[0]
+        assert sent == json.dumps(message, separators=(",", ":"))
+        # Every recipient gets the same serialized string, not a copy
+        assert mock_websocket2.send_text.call_args.args[0] is sent
+
+    @pytest.mark.asyncio
+    async def test_broadcast_serializes_once(self, manager, monkeypatch):
+        """Test a broadcast serializes the message once for all recipients."""
+        calls = []
+
+        def counting_dumps(obj):
+            calls.append(obj)
+            return json.dumps(obj, separators=(",", ":"))
+
+        monkeypatch.setattr(connection_manager_module, "dumps", counting_dumps)
+        for n in range(5):
+            await manager.connect(f"user{n}", AsyncMock())
+
+        assert await manager.broadcast({"text": "Broadcast"}) == 5
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_broadcast_single_user(self, manager):
+        """Test broadcasting to a single connection."""
+        mock_websocket = AsyncMock()
+        await manager.connect("user1", mock_websocket)
+
+        message = {"text": "Broadcast"}
+        sent_count = await manager.broadcast(message)
+
+        assert sent_count == 1
+        mock_websocket.send_text.assert_called_once_with(json.dumps(message, separators=(",", ":")))
+
+    @pytest.mark.asyncio
+    async def test_broadcast_no_connections(self, manager):
+        """Test broadcasting with no connected users."""
+        sent_count = await manager.broadcast({"text": "Broadcast"})
+        assert sent_count == 0
 
     @pytest.mark.asyncio
     async def test_broadcast_with_some_failures(self, manager):
         """Test broadcasting when some connections fail."""
         mock_websocket1 = AsyncMock()
         mock_websocket2 = AsyncMock()
-        mock_websocket2.send_json.side_effect = Exception("Connection error")
+        mock_websocket2.send_text.side_effect = Exception("Connection error")
 
         await manager.connect("user1", mock_websocket1)
         await manager.connect("user2", mock_websocket2)
@@ -112,8 +204,9 @@ class TestConnectionManager:
 
         # Should send to 1 user successfully, 1 fails
         assert sent_count == 1
-        mock_websocket1.send_json.assert_called_once_with(message)
-        mock_websocket2.send_json.assert_called_once_with(message)
+        payload = json.dumps(message, separators=(",", ":"))
+        mock_websocket1.send_text.assert_called_once_with(payload)
+        mock_websocket2.send_text.assert_called_once_with(payload)
         # Verify that the failed connection was removed
         assert "user2" not in manager.connections
 
@@ -145,3 +238,129 @@ class TestConnectionManager:
         assert manager.get_connection_count() == 0
         mock_websocket1.close.assert_called_once()
         mock_websocket2.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_with_close_error(self, manager):
+        """Test cleanup still closes remaining connections when one close fails."""
+        mock_websocket1 = AsyncMock()
+        mock_websocket1.close.side_effect = Exception("Close failed")
+        mock_websocket2 = AsyncMock()
+
+        await manager.connect("user1", mock_websocket1)
+        await manager.connect("user2", mock_websocket2)
+
+        await manager.cleanup()
+
+        assert manager.get_connection_count() == 0
+        mock_websocket2.close.assert_called_once_with(code=1001, reason="Server shutdown")
+
+    @pytest.mark.asyncio
+    async def test_send_to_user_queues_behind_in_flight_send(self, manager):
+        """Test messages sent during an in-flight send are delivered in order by the writer."""
+        release = asyncio.Event()
+        sent = []
+
+        async def slow_send(message):
+            if not sent:
+                await release.wait()
+            sent.append(json.loads(message))
+
+        mock_websocket = AsyncMock()
+        mock_websocket.send_text.side_effect = slow_send
+        await manager.connect("user1", mock_websocket)
+
+        first = asyncio.create_task(manager.send_to_user("user1", {"n": 1}))
+        await asyncio.sleep(0)
+        # The first send is still in flight, so these are queued until the writer sends them
+        queued = [asyncio.create_task(manager.send_to_user("user1", {"n": n})) for n in (2, 3)]
+        await asyncio.sleep(0)
+        assert sent == []
+
+        release.set()
+        assert await first is True
+        assert await asyncio.gather(*queued) == [True, True]
+        assert sent == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+    @pytest.mark.asyncio
+    async def test_send_to_user_drops_when_outbound_queue_full(self, manager, monkeypatch):
+        """Test messages are dropped once a slow connection's outbound queue is full."""
+        monkeypatch.setattr(connection_manager_module, "OUTBOUND_QUEUE_MAXSIZE", 1)
+        release = asyncio.Event()
+
+        async def slow_send(message):
+            await release.wait()
+
+        mock_websocket = AsyncMock()
+        mock_websocket.send_text.side_effect = slow_send
+        await manager.connect("user1", mock_websocket)
+
+        first = asyncio.create_task(manager.send_to_user("user1", {"n": 1}))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(manager.send_to_user("user1", {"n": 2}))
+        await asyncio.sleep(0)
+        assert await manager.send_to_user("user1", {"n": 3}) is False
+
+        release.set()
+        assert await first is True
+        assert await queued is True
+        assert "user1" in manager.connections
+
+    @pytest.mark.asyncio
+    async def test_queued_messages_are_batched(self):
+        """Test the writer merges queued messages into one batch frame when enabled."""
+        manager = ConnectionManager(batch_max_size=2)
+        release = asyncio.Event()
+        frames = []
+
+        async def slow_send(data):
+            if not frames:
+                await release.wait()
+            frames.append(json.loads(data))
+
+        mock_websocket = AsyncMock()
+        mock_websocket.send_text.side_effect = slow_send
+        await manager.connect("user1", mock_websocket)
+
+        first = asyncio.create_task(manager.send_to_user("user1", {"n": 1}))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(manager.send_to_user("user1", {"n": n})) for n in (2, 3, 4)]
+        await asyncio.sleep(0)
+
+        release.set()
+        await first
+        assert await asyncio.gather(*queued) == [True, True, True]
+        assert frames == [{"n": 1}, {"batch": [{"n": 2}, {"n": 3}]}, {"n": 4}]
+
+    @pytest.mark.asyncio
+    async def test_queued_messages_fail_when_connection_is_dropped(self, manager):
+        """Test senders of queued messages learn their message was never sent."""
+        async def failing_send(data):
+            await asyncio.sleep(0)
+            raise RuntimeError("Connection error")
+
+        mock_websocket = AsyncMock()
+        mock_websocket.send_text.side_effect = failing_send
+        await manager.connect("user1", mock_websocket)
+
+        first = asyncio.create_task(manager.send_to_user("user1", {"n": 1}))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(manager.send_to_user("user1", {"n": 2}))
+
+        assert await first is False
+        assert await queued is False
+        assert "user1" not in manager.connections
+        await asyncio.sleep(0)
+        # The dropped connection is closed so the client can reconnect
+        mock_websocket.close.assert_awaited_once_with(code=1011, reason="Send failed")
+
+    @pytest.mark.asyncio
+    async def test_disconnect_stale_websocket_keeps_new_connection(self, manager):
+        """Test a dropped connection's endpoint cannot disconnect the user's newer one."""
+        old_websocket, new_websocket = AsyncMock(), AsyncMock()
+        await manager.connect("user1", new_websocket)
+
+        await manager.disconnect("user1", old_websocket)
+        assert manager.connections["user1"] is new_websocket
+
+        await manager.disconnect("user1", new_websocket)
+        assert "user1" not in manager.connections
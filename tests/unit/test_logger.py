@@ -0,0 +1,40 @@
+"""Unit tests for the contextual logger."""
+
+from websocket_sse_server.utils import logger as logger_module
+from websocket_sse_server.utils.logger import contextual_logger, logger, reload_levels
+
+
+class TestContextualLogger:
+    """Test ContextualLogger level caching."""
+
+    def test_reload_levels_tracks_handlers(self):
+        """Test the cached DEBUG flag follows a handler added after import."""
+        records = []
+        handler_id = logger.add(records.append, level="DEBUG", format="{message}")
+        try:
+            reload_levels("DEBUG")
+            assert contextual_logger.debug_enabled()
+            contextual_logger.debug("visible")
+            assert any("visible" in record for record in records)
+        finally:
+            logger.remove(handler_id)
+            reload_levels()
+
+        assert contextual_logger.debug_enabled() is logger_module._DEBUG_ON
+
+    def test_levels_follow_settings(self, monkeypatch):
+        """Test the cached flags are computed from the configured log level."""
+        monkeypatch.setattr(logger_module.settings, "debug", False)
+        monkeypatch.setattr(logger_module.settings, "log_level", "WARNING")
+        try:
+            reload_levels()
+            assert not contextual_logger.debug_enabled()
+            assert logger_module._INFO_ON is False
+
+            monkeypatch.setattr(logger_module.settings, "log_level", "DEBUG")
+            reload_levels()
+            assert contextual_logger.debug_enabled()
+            assert logger_module._INFO_ON is True
+        finally:
+            monkeypatch.undo()
+            reload_levels()
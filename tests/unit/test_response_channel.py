@@ -0,0 +1,108 @@
+"""Unit tests for ResponseChannel."""
+
+import asyncio
+import pytest
+from websocket_sse_server.core.response_channel import ResponseChannel
+from websocket_sse_server.utils.exceptions import ChannelClosedError
+
+
+class TestResponseChannel:
+    """Test ResponseChannel functionality."""
+
+    @pytest.mark.asyncio
+    async def test_put_then_get(self):
+        """Test items are returned in FIFO order."""
+        channel = ResponseChannel()
+        channel.put_nowait("first")
+        await channel.put("second")
+
+        assert channel.qsize() == 2
+        assert await channel.get() == "first"
+        assert await channel.get() == "second"
+        assert channel.empty()
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_producer(self):
+        """Test a waiting consumer is woken up by put_nowait."""
+        channel = ResponseChannel()
+        consumer = asyncio.create_task(channel.get())
+        await asyncio.sleep(0)
+        assert not consumer.done()
+
+        channel.put_nowait("response")
+        assert await asyncio.wait_for(consumer, timeout=1.0) == "response"
+
+    @pytest.mark.asyncio
+    async def test_get_nowait_empty(self):
+        """Test get_nowait raises QueueEmpty when nothing is queued."""
+        channel = ResponseChannel()
+        with pytest.raises(asyncio.QueueEmpty):
+            channel.get_nowait()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_get_keeps_items(self):
+        """Test a cancelled consumer does not lose later items."""
+        channel = ResponseChannel()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(channel.get(), timeout=0.01)
+
+        channel.put_nowait("late")
+        assert await channel.get() == "late"
+
+    @pytest.mark.asyncio
+    async def test_bounded_put_nowait_raises_when_full(self):
+        """Test put_nowait raises QueueFull once maxsize items are queued."""
+        channel = ResponseChannel(maxsize=1)
+        channel.put_nowait("first")
+        assert channel.full()
+        with pytest.raises(asyncio.QueueFull):
+            channel.put_nowait("second")
+
+    @pytest.mark.asyncio
+    async def test_put_waits_for_space(self):
+        """Test put blocks while full and resumes once the consumer takes an item."""
+        channel = ResponseChannel(maxsize=1)
+        channel.put_nowait("first")
+        producer = asyncio.create_task(channel.put("second"))
+        await asyncio.sleep(0)
+        assert not producer.done()
+
+        assert await channel.get() == "first"
+        await asyncio.wait_for(producer, timeout=1.0)
+        assert channel.get_nowait() == "second"
+
+    @pytest.mark.asyncio
+    async def test_close_bypasses_maxsize(self):
+        """Test the end-of-stream sentinel is queued even when the channel is full."""
+        channel = ResponseChannel(maxsize=1)
+        channel.put_nowait("first")
+        channel.close()
+        assert await channel.get() == "first"
+        assert await channel.get() is None
+
+    @pytest.mark.asyncio
+    async def test_close_refuses_waiting_and_later_producers(self):
+        """Test close wakes producers blocked for space, and no put is accepted after it."""
+        channel = ResponseChannel(maxsize=1)
+        channel.put_nowait("first")
+        producer = asyncio.create_task(channel.put("second"))
+        await asyncio.sleep(0)
+
+        channel.close()
+        with pytest.raises(ChannelClosedError):
+            await asyncio.wait_for(producer, timeout=1.0)
+        with pytest.raises(ChannelClosedError):
+            channel.put_nowait("third")
+        assert await channel.get() == "first"
+        assert await channel.get() is None
+
+    @pytest.mark.asyncio
+    async def test_close_wakes_waiting_consumer(self):
+        """Test a consumer blocked in get is woken with the sentinel on close."""
+        channel = ResponseChannel()
+        consumer = asyncio.create_task(channel.get())
+        await asyncio.sleep(0)
+
+        channel.close()
+        assert await asyncio.wait_for(consumer, timeout=1.0) is None
+        assert channel.empty()
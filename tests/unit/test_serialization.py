@@ -0,0 +1,41 @@
+"""Unit tests for JSON serialization helpers."""
+
+import json
+import pytest
+from websocket_sse_server.utils.serialization import JSONDecodeError, dumps, dumps_bytes, loads
+
+
+class TestSerialization:
+    """Test serialization helpers."""
+
+    def test_dumps_matches_send_json_encoding(self):
+        """Test dumps produces the same text as Starlette's send_json."""
+        message = {"text": "héllo", "n": 1, "nested": {"ok": True}}
+        assert dumps(message) == json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def test_dumps_bytes_matches_dumps(self):
+        """Test dumps_bytes is the UTF-8 encoding of dumps."""
+        message = {"text": "héllo", "is_final": False}
+        assert dumps_bytes(message) == dumps(message).encode("utf-8")
+
+    def test_integers_beyond_64_bits(self):
+        """Test integers orjson rejects are still serialized, as send_json would."""
+        message = {"n": 2**64, "m": -2**70}
+        assert dumps(message) == json.dumps(message, separators=(",", ":"))
+        assert dumps_bytes(message) == dumps(message).encode("utf-8")
+
+    def test_unserializable_value(self):
+        """Test values neither encoder accepts still raise TypeError."""
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+    def test_round_trip(self):
+        """Test loads accepts both str and bytes."""
+        message = {"correlation_id": "abc", "is_final": True}
+        assert loads(dumps(message)) == message
+        assert loads(dumps(message).encode("utf-8")) == message
+
+    def test_invalid_json(self):
+        """Test invalid input raises the shared JSONDecodeError."""
+        with pytest.raises(JSONDecodeError):
+            loads("not json")
@@ -1,26 +1,40 @@
 """Unit tests for SSEHandler."""
 
+import asyncio
+import json
+import time
 import pytest
 from unittest.mock import AsyncMock
+from websocket_sse_server.core import sse_handler as sse_handler_module
 from websocket_sse_server.core.sse_handler import SSEHandler
 from websocket_sse_server.core.connection_manager import ConnectionManager
+from websocket_sse_server.models.message import SSEMessage
+from .._fakes import FakeBroker, FakeWebSocket
 
 
 class TestSSEHandler:
     """Test SSEHandler functionality."""
 
+    @pytest.fixture(scope="class")
+    def shared_handler(self):
+        """Create one SSEHandler for the whole class."""
+        return SSEHandler(ConnectionManager())
+
     @pytest.fixture
-    def handler(self):
-        """Create an SSEHandler instance for testing."""
-        connection_manager = ConnectionManager()
-        return SSEHandler(connection_manager)
+    async def handler(self, shared_handler):
+        """Provide the shared SSEHandler, reset after each test."""
+        yield shared_handler
+        await shared_handler.connection_manager.cleanup()
+        for correlation_id in list(shared_handler.request_response_queues):
+            await shared_handler.unregister_request_response(correlation_id)
+        shared_handler.correlation_map.clear()
 
     @pytest.mark.asyncio
     async def test_process_sse_message_success(self, handler):
         """Test processing a valid SSE message successfully."""
         # Mock connection
-        mock_websocket = AsyncMock()
-        await handler.connection_manager.connect("user1", mock_websocket)
+        websocket = FakeWebSocket()
+        await handler.connection_manager.connect("user1", websocket)
 
         message = {
             "user_id": "user1",
@@ -31,12 +45,20 @@ class TestSSEHandler:
         result = await handler.process_sse_message(message)
         assert result is True
         # The message now includes user_id and correlation_id
-        call_args = mock_websocket.send_json.call_args
-        sent_message = call_args[0][0]
+        [sent_message] = websocket.sent
         assert sent_message["text"] == "Hello"
         assert sent_message["user_id"] == "user1"
         assert "correlation_id" in sent_message
 
+    @pytest.mark.asyncio
+    async def test_process_sse_message_large_integer(self, handler):
+        """Test integers beyond 64 bits are delivered, as send_json would deliver them."""
+        websocket = FakeWebSocket()
+        await handler.connection_manager.connect("user1", websocket)
+
+        assert await handler.process_sse_message({"user_id": "user1", "data": {"n": 2**64}}) is True
+        assert websocket.sent[0]["n"] == 2**64
+
     @pytest.mark.asyncio
     async def test_process_sse_message_user_not_connected(self, handler):
         """Test processing message when user is not connected."""
@@ -60,8 +82,8 @@ class TestSSEHandler:
     @pytest.mark.asyncio
     async def test_process_sse_message_with_optional_fields(self, handler):
         """Test processing message with optional fields."""
-        mock_websocket = AsyncMock()
-        await handler.connection_manager.connect("user1", mock_websocket)
+        websocket = FakeWebSocket()
+        await handler.connection_manager.connect("user1", websocket)
 
         message = {
             "user_id": "user1",
@@ -74,20 +96,43 @@ class TestSSEHandler:
         result = await handler.process_sse_message(message)
         assert result is True
         # The message now includes user_id and correlation_id
-        call_args = mock_websocket.send_json.call_args
-        sent_message = call_args[0][0]
+        [sent_message] = websocket.sent
         assert sent_message["text"] == "Hello"
         assert sent_message["user_id"] == "user1"
         assert "correlation_id" in sent_message
 
+    @pytest.mark.asyncio
+    async def test_process_validated_sse_message(self, handler):
+        """Test processing an already validated SSEMessage model."""
+        websocket = FakeWebSocket()
+        await handler.connection_manager.connect("user1", websocket)
+
+        message = SSEMessage(user_id="user1", data={"text": "Hello"})
+
+        result = await handler.process_sse_message(message)
+        assert result is True
+        [sent_message] = websocket.sent
+        assert sent_message["text"] == "Hello"
+        assert sent_message["user_id"] == "user1"
+
+    @pytest.mark.asyncio
+    async def test_process_sse_message_trusted_upstream(self):
+        """Test trusted upstream dicts are built without validation."""
+        handler = SSEHandler(ConnectionManager(), trust_upstream=True)
+        websocket = FakeWebSocket()
+        await handler.connection_manager.connect("user1", websocket)
+
+        # event_type would fail validation, but is not checked for trusted input
+        result = await handler.process_sse_message({"user_id": "user1", "data": {"text": "Hi"}, "event_type": 1})
+
+        assert result is True
+        assert websocket.sent[0]["text"] == "Hi"
+
     @pytest.mark.asyncio
     async def test_process_batch_sse_messages(self, handler):
         """Test processing multiple SSE messages."""
-        mock_websocket1 = AsyncMock()
-        mock_websocket2 = AsyncMock()
-
-        await handler.connection_manager.connect("user1", mock_websocket1)
-        await handler.connection_manager.connect("user2", mock_websocket2)
+        await handler.connection_manager.connect("user1", FakeWebSocket())
+        await handler.connection_manager.connect("user2", FakeWebSocket())
 
         messages = [
             {"user_id": "user1", "data": {"msg": "msg1"}},
@@ -103,11 +148,178 @@ class TestSSEHandler:
         assert results[2]["success"] is False
 
     @pytest.mark.asyncio
-    async def test_process_sse_message_connection_error(self, handler):
-        """Test processing message when connection fails."""
+    async def test_push_sse_messages_are_coalesced(self, handler, monkeypatch):
+        """Test concurrent pushes are flushed as one batch behind the first."""
+        async def slow_send(message):
+            await asyncio.sleep(0)
+
         mock_websocket = AsyncMock()
-        mock_websocket.send_json.side_effect = Exception("Connection error")
+        mock_websocket.send_text.side_effect = slow_send
         await handler.connection_manager.connect("user1", mock_websocket)
+        monkeypatch.setattr(handler, "process_batch_sse_messages",
+                            AsyncMock(wraps=handler.process_batch_sse_messages))
+
+        messages = [
+            SSEMessage(user_id="user1" if i != 2 else "user2", data={"msg": f"msg{i}"})
+            for i in range(4)
+        ]
+        results = await asyncio.gather(*(handler.push_sse_message(m) for m in messages))
+
+        assert results == [True, True, False, True]
+        assert mock_websocket.send_text.call_count == 3
+        # The first push goes out alone, the rest share a single batch
+        handler.process_batch_sse_messages.assert_awaited_once()
+        assert len(handler.process_batch_sse_messages.call_args[0][0]) == 3
+        assert handler._push_task is None
+        assert handler._push_dispatching is False
+
+    @pytest.mark.asyncio
+    async def test_push_sse_message_times_out_stuck_client(self):
+        """Test a push stuck on a slow client gives up and does not hold back later pushes."""
+        handler = SSEHandler(ConnectionManager(), send_timeout=0.05)
+
+        async def stuck_send(data):
+            await asyncio.sleep(10)
+
+        stuck_websocket = AsyncMock()
+        stuck_websocket.send_text.side_effect = stuck_send
+        await handler.connection_manager.connect("slow", stuck_websocket)
+        await handler.connection_manager.connect("fast", FakeWebSocket())
+
+        stuck = asyncio.create_task(handler.push_sse_message(SSEMessage(user_id="slow", data={"n": 1})))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(handler.push_sse_message(SSEMessage(user_id="fast", data={"n": 2})))
+
+        # Reported like a buffered push that timed out, not raised
+        assert await stuck is False
+        assert await queued is True
+
+    @pytest.mark.asyncio
+    async def test_stop_resolves_buffered_pushes(self):
+        """Test stopping the handler reports pushes it will never dispatch as undelivered."""
+        handler = SSEHandler(ConnectionManager(), send_timeout=None)
+        release = asyncio.Event()
+
+        async def blocked_send(data):
+            await release.wait()
+
+        blocked_websocket = AsyncMock()
+        blocked_websocket.send_text.side_effect = blocked_send
+        await handler.connection_manager.connect("user1", blocked_websocket)
+
+        first = asyncio.create_task(handler.push_sse_message(SSEMessage(user_id="user1", data={"n": 1})))
+        await asyncio.sleep(0)
+        buffered = asyncio.create_task(handler.push_sse_message(SSEMessage(user_id="user1", data={"n": 2})))
+        await asyncio.sleep(0)
+
+        await handler.stop()
+        assert await buffered is False
+
+        release.set()
+        assert await first is True
+        assert handler._push_task is None
+
+    @pytest.mark.asyncio
+    async def test_process_batch_isolates_failures(self, handler, monkeypatch):
+        """Test one failing message does not affect the rest of the batch."""
+        original = handler.process_sse_message
+
+        async def flaky(raw_message):
+            if raw_message["user_id"] == "boom":
+                raise RuntimeError("boom")
+            return await original(raw_message)
+
+        monkeypatch.setattr(handler, "process_sse_message", flaky)
+        await handler.connection_manager.connect("user1", FakeWebSocket())
+
+        results = await handler.process_batch_sse_messages([
+            {"user_id": "boom", "data": {}},
+            {"user_id": "user1", "data": {}},
+        ])
+
+        assert results[0] == {"index": 0, "user_id": "boom", "success": False, "error": "boom"}
+        assert results[1] == {"index": 1, "user_id": "user1", "success": True}
+
+        single = await handler.process_batch_sse_messages([{"user_id": "boom", "data": {}}])
+        assert single == [{"index": 0, "user_id": "boom", "success": False, "error": "boom"}]
+
+    @pytest.mark.asyncio
+    async def test_process_batch_times_out_stuck_client(self):
+        """Test a stuck client fails its own message without holding up the batch."""
+        handler = SSEHandler(ConnectionManager(), send_timeout=0.05)
+
+        async def stuck_send(data):
+            await asyncio.sleep(10)
+
+        stuck_websocket = AsyncMock()
+        stuck_websocket.send_text.side_effect = stuck_send
+        await handler.connection_manager.connect("stuck", stuck_websocket)
+        await handler.connection_manager.connect("user1", FakeWebSocket())
+
+        started = time.monotonic()
+        results = await handler.process_batch_sse_messages([
+            {"user_id": "stuck", "data": {}},
+            {"user_id": "user1", "data": {}},
+        ])
+
+        assert time.monotonic() - started < 1
+        assert results[0]["success"] is False
+        assert "timed out" in results[0]["error"]
+        assert results[1]["success"] is True
+
+    @pytest.mark.asyncio
+    async def test_batch_timeout_evicts_connection_with_queued_messages(self):
+        """Test a send cut off by the batch timeout drops the connection, not just the send."""
+        handler = SSEHandler(ConnectionManager(), send_timeout=0.05)
+
+        async def stuck_send(data):
+            await asyncio.sleep(10)
+
+        stuck_websocket = AsyncMock()
+        stuck_websocket.send_text.side_effect = stuck_send
+        await handler.connection_manager.connect("user1", stuck_websocket)
+
+        batch = asyncio.create_task(handler.process_batch_sse_messages([{"user_id": "user1", "data": {"n": 1}}]))
+        await asyncio.sleep(0)
+        # Queued behind the in-flight send
+        queued = asyncio.create_task(handler.process_sse_message({"user_id": "user1", "data": {"n": 2}}))
+
+        results = await batch
+        assert results[0]["success"] is False
+        # The queued message is reported as failed, not silently dropped
+        assert await queued is False
+        stuck_websocket.close.assert_awaited_once_with(code=1011, reason="Send failed")
+        # No outbox is left holding the queued message without a writer
+        assert "user1" not in handler.connection_manager.connections
+        assert "user1" not in handler.connection_manager._outboxes
+
+    @pytest.mark.asyncio
+    async def test_broker_fans_out_to_worker_holding_user(self):
+        """Test a message is published once and delivered by the worker holding the user."""
+        channels = {}
+        publisher = SSEHandler(ConnectionManager(), broker=FakeBroker(channels))
+        holder = SSEHandler(ConnectionManager(), broker=FakeBroker(channels))
+        publisher.start()
+        holder.start()
+        try:
+            websocket = FakeWebSocket()
+            await holder.connection_manager.connect("user1", websocket)
+            await holder.user_connected("user1")
+
+            assert await publisher.process_sse_message({"user_id": "user1", "data": {"text": "Hello"}}) is True
+            assert len(publisher.broker.published) == 1
+            assert websocket.sent[0]["text"] == "Hello"
+
+            await holder.user_disconnected("user1")
+            assert await publisher.process_sse_message({"user_id": "user1", "data": {"text": "Bye"}}) is False
+        finally:
+            await publisher.stop()
+            await holder.stop()
+
+    @pytest.mark.asyncio
+    async def test_process_sse_message_connection_error(self, handler):
+        """Test processing message when connection fails."""
+        await handler.connection_manager.connect("user1", FakeWebSocket(fail=True))
 
         message = {
             "user_id": "user1",
@@ -116,3 +328,111 @@ class TestSSEHandler:
 
         result = await handler.process_sse_message(message)
         assert result is False
+        # The failed connection is dropped so later messages fail fast
+        assert "user1" not in handler.connection_manager.connections
+
+    @pytest.mark.asyncio
+    async def test_send_to_request_response_skips_await_when_queue_has_room(self, handler, monkeypatch):
+        """Test responses are enqueued without awaiting put while the queue has room."""
+        queue = await handler.register_request_response("corr1")
+
+        async def fail_put(self, item):
+            raise AssertionError("put should not be awaited")
+
+        # ResponseChannel is slotted, so patch the class rather than the instance
+        monkeypatch.setattr(sse_handler_module.ResponseChannel, "put", fail_put)
+        assert await handler.send_to_request_response("corr1", {"n": 1}) is True
+        assert queue.get_nowait() == b'{"n":1}'
+
+    @pytest.mark.asyncio
+    async def test_send_to_request_response_drops_when_consumer_is_slow(self, handler, monkeypatch):
+        """Test responses are dropped once a full response queue stays full."""
+        monkeypatch.setattr(sse_handler_module, "RESPONSE_QUEUE_MAXSIZE", 1)
+        monkeypatch.setattr(sse_handler_module, "RESPONSE_PUT_TIMEOUT_SECONDS", 0.01)
+        queue = await handler.register_request_response("corr1")
+
+        assert await handler.send_to_request_response("corr1", {"n": 1}) is True
+        assert await handler.send_to_request_response("corr1", {"n": 2}) is False
+        assert queue.qsize() == 1
+
+        await handler.unregister_request_response("corr1")
+        assert queue.get_nowait() == b'{"n":1}'
+        assert queue.get_nowait() is None
+
+    def test_cleanup_expired_correlations(self, handler):
+        """Test only correlation entries older than the TTL are removed."""
+        now = time.monotonic()
+        handler.correlation_map["old"] = ("user1", now - sse_handler_module.CORRELATION_TTL_SECONDS - 1)
+        handler.correlation_map["older_but_reused"] = ("user3", now - sse_handler_module.CORRELATION_TTL_SECONDS - 1)
+        handler._store_correlation("older_but_reused", "user3")
+        handler._store_correlation("fresh", "user2")
+
+        assert handler._cleanup_expired_correlations() == 1
+        assert list(handler.correlation_map) == ["older_but_reused", "fresh"]
+        assert handler._get_correlation_user("fresh") == "user2"
+
+        handler._remove_correlation("fresh")
+        assert handler._get_correlation_user("fresh") is None
+
+    def test_correlation_map_evicts_oldest_when_full(self, handler, monkeypatch):
+        """Test the correlation map drops its oldest entry beyond the size cap."""
+        monkeypatch.setattr(sse_handler_module, "CORRELATION_MAP_MAXSIZE", 2)
+        handler._store_correlation("a", "user1")
+        handler._store_correlation("b", "user2")
+        handler._store_correlation("c", "user3")
+
+        assert list(handler.correlation_map) == ["b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_cleanup_idle_request_response_flows(self, handler):
+        """Test flows with no activity within the idle TTL are closed."""
+        stale = await handler.register_request_response("stale")
+        await handler.register_request_response("active")
+        handler._flow_activity["stale"] -= sse_handler_module.REQUEST_RESPONSE_IDLE_TTL_SECONDS + 1
+        handler._flow_activity.move_to_end("stale", last=False)
+
+        assert handler._cleanup_idle_flows() == 1
+        assert list(handler.request_response_queues) == ["active"]
+        assert await stale.get() is None
+
+    @pytest.mark.asyncio
+    async def test_request_response_flows_capped(self, handler, monkeypatch):
+        """Test registering beyond the cap closes the least recently active flow."""
+        monkeypatch.setattr(sse_handler_module, "REQUEST_RESPONSE_MAX_FLOWS", 2)
+        first = await handler.register_request_response("a")
+        await handler.register_request_response("b")
+        await handler.send_to_request_response("a", {"content": "keeps a active"})
+        await handler.register_request_response("c")
+
+        assert set(handler.request_response_queues) == {"a", "c"}
+        assert list(handler._flow_activity) == ["a", "c"]
+        assert first.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_start_and_stop_cleanup_task(self, handler, monkeypatch):
+        """Test the background task expires correlations until stopped."""
+        monkeypatch.setattr(sse_handler_module, "CORRELATION_CLEANUP_INTERVAL_SECONDS", 0)
+        handler.correlation_map["old"] = ("user1", time.monotonic() - sse_handler_module.CORRELATION_TTL_SECONDS - 1)
+
+        handler.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert "old" not in handler.correlation_map
+
+        await handler.stop()
+        assert handler._cleanup_task is None
+
+    @pytest.mark.asyncio
+    async def test_forward_reuses_raw_frame(self, handler):
+        """Test an unchanged raw frame is queued as-is, unless it contains line breaks."""
+        queue = await handler.register_request_response("corr1")
+
+        raw = '{"correlation_id": "corr1", "reply": "hi"}'
+        assert await handler.forward_websocket_response_to_sse("user1", json.loads(raw), raw=raw) is True
+        assert queue.get_nowait() == raw.encode("utf-8")
+
+        pretty = '{\n  "correlation_id": "corr1"\n}'
+        assert await handler.forward_websocket_response_to_sse("user1", json.loads(pretty), raw=pretty) is True
+        assert queue.get_nowait() == b'{"correlation_id":"corr1"}'
+
+        await handler.unregister_request_response("corr1")
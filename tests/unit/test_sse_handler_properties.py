@@ -0,0 +1,62 @@
+"""Property-based tests for the SSE handler hot path."""
+
+import asyncio
+import os
+import time
+import pytest
+from websocket_sse_server.core.connection_manager import ConnectionManager
+from websocket_sse_server.core.sse_handler import SSEHandler
+from .._fakes import FakeWebSocket
+
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import given, settings, strategies as st  # noqa: E402
+
+# Wall-clock budget for one batch of BATCH_SIZE messages. Timing is only checked
+# when set, e.g. SSE_BATCH_BUDGET_SECONDS=0.5 on a dedicated benchmark machine
+_BUDGET = os.getenv("SSE_BATCH_BUDGET_SECONDS")
+BATCH_BUDGET_SECONDS = float(_BUDGET) if _BUDGET else None
+
+# Batch size the budget applies to
+BATCH_SIZE = 1000
+
+# A few generated message shapes, repeated to fill a batch; generating every
+# message of a full batch would make Hypothesis far slower than the code under test
+message_shapes = st.lists(
+    st.fixed_dictionaries({
+        "user_id": st.sampled_from(["u1", "u2", "offline"]),
+        "data": st.dictionaries(st.text(max_size=8), st.integers(), max_size=5),
+    }),
+    min_size=1,
+    max_size=20,
+)
+
+
+async def _process_batch(raw_messages):
+    handler = SSEHandler(ConnectionManager())
+    websockets = {"u1": FakeWebSocket(), "u2": FakeWebSocket()}
+    for user_id, websocket in websockets.items():
+        await handler.connection_manager.connect(user_id, websocket)
+
+    started = time.perf_counter()
+    results = await handler.process_batch_sse_messages(raw_messages)
+    return time.perf_counter() - started, results, websockets
+
+
+@settings(max_examples=3, deadline=None)
+@given(shapes=message_shapes)
+def test_process_batch_within_budget(shapes):
+    """Test arbitrary batches are routed correctly, and within the time budget if one is set."""
+    # The handler adds routing fields to data, so every message gets its own copy
+    raw_messages = [
+        {"user_id": shape["user_id"], "data": dict(shape["data"])}
+        for shape in (shapes[i % len(shapes)] for i in range(BATCH_SIZE))
+    ]
+    expected = [message["user_id"] != "offline" for message in raw_messages]
+    delivered = sum(expected)
+
+    elapsed, results, websockets = asyncio.run(_process_batch(raw_messages))
+
+    assert [result["success"] for result in results] == expected
+    assert sum(len(websocket.sent) for websocket in websockets.values()) == delivered
+    if BATCH_BUDGET_SECONDS is not None:
+        assert elapsed < BATCH_BUDGET_SECONDS